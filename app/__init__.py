@@ -4,10 +4,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from werkzeug.security import generate_password_hash
 from config import Config
-from sqlalchemy import inspect, text, event
+from sqlalchemy import event
 from sqlalchemy.engine import Engine
 import click
-from flask import url_for
 from authlib.integrations.flask_client import OAuth
 from datetime import datetime
 
@@ -16,6 +15,9 @@ login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
 oauth = OAuth()
 
+from .analytics_buffer import analytics_buffer, record_event
+from .stats_cache import stats_cache
+
 # Enable foreign key support for SQLite
 @event.listens_for(Engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
@@ -52,6 +54,8 @@ def create_app():
 
     db.init_app(app)
     login_manager.init_app(app)
+    analytics_buffer.init_app(app)
+    stats_cache.init_app(app)
 
     # Register nl2br filter for Jinja2
     def nl2br(value):
@@ -59,25 +63,33 @@ def create_app():
             return ''
         return value.replace('\n', '<br>')
     
-    # Register excerpt filter for creating text excerpts from HTML
+    # Register excerpt filter: accepts an Article (uses its stored plain text) or raw HTML
     def excerpt(value, length=200):
-        import bleach
-        try:
-            # Remove HTML tags to get plain text
-            text = bleach.clean(value, tags=[], strip=True)
-            # Clean up extra whitespace
-            text = ' '.join(text.split())
-            # Truncate if needed
-            if len(text) > length:
-                text = text[:length].rsplit(' ', 1)[0] + '...'
-            return text
-        except Exception:
-            return value[:length] + '...' if len(value) > length else value
+        from .content import create_excerpt, truncate_text
+        if value is None:
+            return ''
+        plain_text = getattr(value, 'plain_text', None)
+        if plain_text is not None:
+            return truncate_text(plain_text, length)
+        return create_excerpt(getattr(value, 'content', value), length)
     
     app.jinja_env.filters['nl2br'] = nl2br
     app.jinja_env.filters['excerpt'] = excerpt
 
+    from .images import responsive_image
+    app.jinja_env.globals['responsive_image'] = responsive_image
+
     from . import models
+    from .notifications import unread_cache
+    unread_cache.init_app(app)
+    from .identity import identity_cache
+    identity_cache.init_app(app)
+    from .uploads import uploader
+    uploader.init_app(app)
+    from .page_cache import page_cache
+    page_cache.init_app(app)
+    from .assets import assets
+    assets.init_app(app)
 
     from .routes.articles import bp as articles_bp
     app.register_blueprint(articles_bp)
@@ -93,120 +105,15 @@ def create_app():
     from .routes.weather import bp as weather_bp
     app.register_blueprint(weather_bp)
 
-    @login_manager.user_loader
-    def load_user(user_id):
-        from .models import User
-        return User.query.get(int(user_id))
-
-    with app.app_context():
-        db.create_all()  # For both SQLite and Supabase
-        
-        # Ensure notification table has correct schema
-        try:
-            inspector = inspect(db.engine)
-            if 'notification' in inspector.get_table_names():
-                cols = [col['name'] for col in inspector.get_columns('notification')]
-                
-                # Fix notification table schema if needed
-                if 'read' in cols and 'is_read' not in cols:
-                    # Rename 'read' column to 'is_read'
-                    db.session.execute(text('ALTER TABLE notification RENAME COLUMN read TO is_read'))
-                    db.session.commit()
-                    print("✅ Fixed notification.read -> notification.is_read")
-                
-                # Ensure timestamp column exists
-                if 'timestamp' not in cols and 'created_at' in cols:
-                    db.session.execute(text('ALTER TABLE notification RENAME COLUMN created_at TO timestamp'))
-                    db.session.commit()
-                    print("✅ Fixed notification.created_at -> notification.timestamp")
-                    
-        except Exception as e:
-            print(f"⚠️ Database migration note: {e}")
-        
-        # Ensure trust_score column exists (SQLite won't auto-migrate)
-        inspector = inspect(db.engine)
-        cols = [col['name'] for col in inspector.get_columns('article')]
-        if 'trust_score' not in cols:
-            # Add trust_score column manually for existing SQLite databases
-            db.session.execute(
-                text('ALTER TABLE article ADD COLUMN trust_score FLOAT')
-            )
-            db.session.commit()
-            print("✅ Added trust_score column to articles")
-
-        # Ensure new User profile columns exist
-        user_cols = [col['name'] for col in inspector.get_columns('user')]
-        if 'name' not in user_cols:
-            db.session.execute(text('ALTER TABLE user ADD COLUMN name VARCHAR(150)'))
-        if 'bio' not in user_cols:
-            db.session.execute(text('ALTER TABLE user ADD COLUMN bio TEXT'))
-        if 'email' not in user_cols:
-            db.session.execute(text('ALTER TABLE user ADD COLUMN email VARCHAR(150)'))
-        if 'profile_image' not in user_cols:
-            db.session.execute(text('ALTER TABLE user ADD COLUMN profile_image VARCHAR(200)'))
-        if 'is_confirmed' not in user_cols:
-            db.session.execute(text('ALTER TABLE user ADD COLUMN is_confirmed BOOLEAN DEFAULT 0'))
-        if 'is_super_admin' not in user_cols:
-            db.session.execute(text('ALTER TABLE user ADD COLUMN is_super_admin BOOLEAN DEFAULT 0'))
-        
-        # Ensure new Article columns exist
-        article_cols = [col['name'] for col in inspector.get_columns('article')]
-        if 'category_id' not in article_cols:
-            db.session.execute(text('ALTER TABLE article ADD COLUMN category_id INTEGER'))
-        if 'tags' not in article_cols:
-            db.session.execute(text('ALTER TABLE article ADD COLUMN tags VARCHAR(500)'))
-        if 'image_url' not in article_cols:
-            db.session.execute(text('ALTER TABLE article ADD COLUMN image_url VARCHAR(500)'))
-        if 'created_at' not in article_cols:
-            # SQLite doesn't support non-constant defaults, so add column without default
-            db.session.execute(text('ALTER TABLE article ADD COLUMN created_at DATETIME'))
-            # Update existing articles with current timestamp
-            db.session.execute(text("UPDATE article SET created_at = datetime('now') WHERE created_at IS NULL"))
-        
-        db.session.commit()
-        
-        # Create default categories
-        from .models import Category
-        default_categories = [
-            {'name': 'News', 'description': 'Latest campus and world news', 'color': '#EF4444'},
-            {'name': 'Sports', 'description': 'Sports coverage and updates', 'color': '#10B981'},
-            {'name': 'Opinion', 'description': 'Editorial and opinion pieces', 'color': '#8B5CF6'},
-            {'name': 'Arts & Culture', 'description': 'Arts, culture, and entertainment', 'color': '#F59E0B'},
-            {'name': 'Technology', 'description': 'Tech news and innovations', 'color': '#3B82F6'},
-            {'name': 'Lifestyle', 'description': 'Lifestyle and student life', 'color': '#EC4899'}
-        ]
-        
-        for cat_data in default_categories:
-            if not Category.query.filter_by(name=cat_data['name']).first():
-                category = Category(**cat_data)
-                db.session.add(category)
-        
-        db.session.commit()
-
-        # Optionally: Seed or update default admin user from environment variables (for public repos, do not hardcode)
-        from .models import User
-        admin_username = 'admin@dev'
-        admin_password = 'admin@dev'
-        admin_email = 'admin@dev'
-        existing_admin = User.query.filter_by(username=admin_username).first()
-        if existing_admin:
-            existing_admin.role = 'admin'
-            existing_admin.password = generate_password_hash(admin_password)
-            existing_admin.is_confirmed = True
-            existing_admin.email = admin_email
-            existing_admin.is_super_admin = True
-            # Prevent deletion by setting a flag or logic in model (see models.py)
-        else:
-            admin = User(
-                username=admin_username,
-                password=generate_password_hash(admin_password),
-                role='admin',
-                is_confirmed=True,
-                email=admin_email,
-                is_super_admin=True
-            )
-            db.session.add(admin)
-        db.session.commit()
+    # CLI command: apply pending schema steps and seed defaults (run on deploy, not on every boot)
+    @app.cli.command('db-upgrade')
+    def db_upgrade():
+        """Create missing tables, apply pending migrations and seed default data"""
+        from .migrations import upgrade, current_version
+        applied = upgrade()
+        for step in applied:
+            click.echo(f'Applied {step}')
+        click.echo(f'Database at schema version {current_version()}.')
 
     # CLI command: create admin user
     @app.cli.command('create-admin')
@@ -249,15 +156,13 @@ def create_app():
     @app.errorhandler(404)
     def not_found_error(error):
         from flask import render_template, request
-        from .models import Article, Analytics
+        from .models import Article
         
         # Get popular articles for 404 page
         popular_articles = Article.query.filter_by(status='approved').limit(5).all()
         
         # Log 404 error
-        analytics = Analytics(event_type='404_error')
-        db.session.add(analytics)
-        db.session.commit()
+        record_event('404_error')
         
         template = '404.html'
         return render_template(template, articles=popular_articles), 404
@@ -265,7 +170,7 @@ def create_app():
     @app.errorhandler(500)
     def internal_error(error):
         from flask import render_template, request
-        from .models import Article, Analytics
+        from .models import Article
         
         db.session.rollback()
         
@@ -273,67 +178,248 @@ def create_app():
         popular_articles = Article.query.filter_by(status='approved').limit(5).all()
         
         # Log 500 error
-        analytics = Analytics(event_type='500_error')
-        db.session.add(analytics)
-        db.session.commit()
+        record_event('500_error')
         
         template = '500.html'
         return render_template(template, articles=popular_articles), 500
 
     # CLI command: send digest of approved articles
     @app.cli.command('send-digest')
-    def send_digest():
-        """Prints a digest of all approved articles with links"""
+    @click.option('--days', default=7, show_default=True, help='Include articles approved in the last N days')
+    @click.option('--limit', default=20, show_default=True, help='Maximum articles in the digest')
+    @click.option('--chunk-size', type=int, default=None, help='Subscribers per chunk (default DIGEST_CHUNK_SIZE)')
+    @click.option('--concurrency', type=int, default=None, help='Parallel SMTP connections (default DIGEST_CONCURRENCY)')
+    @click.option('--dry-run', is_flag=True, default=False, help='Print the digest instead of sending it')
+    def send_digest(days, limit, chunk_size, concurrency, dry_run):
+        """Email the digest of recent approved articles to newsletter subscribers"""
+        from .digest import render_digest, send_digest as run_digest
+        from .mailer import email_configured
+        if dry_run:
+            subject, body, _ = render_digest(app, days, limit)
+            click.echo(f'{subject}\n\n{body}' if body else 'No new approved articles.')
+            return
+        if not email_configured():
+            click.echo('SMTP_SERVER, SMTP_PORT and EMAIL_SENDER must be set.')
+            raise SystemExit(1)
+        run_digest(app, days=days, limit=limit,
+                   chunk_size=chunk_size or app.config['DIGEST_CHUNK_SIZE'],
+                   concurrency=concurrency or app.config['DIGEST_CONCURRENCY'],
+                   echo=click.echo)
+
+    # CLI command: rebuild article view counters from analytics rollups and raw events
+    @app.cli.command('backfill-views')
+    def backfill_views():
+        """Recompute Article.views from the rolled-up and not-yet-aggregated 'view' events"""
+        from .models import Article, Analytics, AnalyticsDaily
+        from .analytics_rollup import last_processed_id
+        from sqlalchemy import func, select
+        rolled_up = select(func.coalesce(func.sum(AnalyticsDaily.count), 0))\
+            .where(AnalyticsDaily.article_id == Article.id, AnalyticsDaily.event_type == 'view')\
+            .scalar_subquery()
+        pending = select(func.count(Analytics.id))\
+            .where(Analytics.id > last_processed_id(), Analytics.article_id == Article.id,
+                   Analytics.event_type == 'view')\
+            .scalar_subquery()
+        updated = Article.query.update({Article.views: rolled_up + pending}, synchronize_session=False)
+        db.session.commit()
+        click.echo(f'Rebuilt view counters for {updated} articles.')
+
+    # CLI command: fold raw analytics into the rollup tables (run from cron)
+    @app.cli.command('aggregate-analytics')
+    @click.option('--batch-size', default=5000, show_default=True)
+    @click.option('--compact', is_flag=True, default=False,
+                  help='Also delete aggregated raw events older than ANALYTICS_RAW_RETENTION_DAYS')
+    def aggregate_analytics_command(batch_size, compact):
+        """Update hourly/daily analytics rollups from new raw events"""
+        from .analytics_rollup import aggregate_analytics, compact_raw_analytics
+        # Events still sitting in a worker's buffer or an open transaction are left for the next run
+        lag = 2 * app.config['ANALYTICS_FLUSH_INTERVAL']
+        click.echo(f'Aggregated {aggregate_analytics(batch_size, lag)} analytics events.')
+        if compact:
+            days = app.config['ANALYTICS_RAW_RETENTION_DAYS']
+            click.echo(f'Deleted {compact_raw_analytics(days, batch_size)} raw events older than {days} days.')
+
+    # CLI command: fill excerpt/plain_text/word_count for articles saved before they existed
+    @app.cli.command('backfill-article-text')
+    @click.option('--batch-size', default=200, show_default=True)
+    def backfill_article_text(batch_size):
+        """Precompute derived text fields for existing articles"""
         from .models import Article
-        arts = Article.query.filter_by(status='approved').order_by(Article.id.desc()).all()
-        if not arts:
-            click.echo('No approved articles found.')
+        updated = 0
+        last_id = 0
+        while True:
+            batch = Article.query.filter(Article.id > last_id, Article.plain_text.is_(None))\
+                .order_by(Article.id).limit(batch_size).all()
+            if not batch:
+                break
+            for article in batch:
+                article.refresh_text_fields()
+            last_id = batch[-1].id
+            updated += len(batch)
+            db.session.commit()
+        click.echo(f'Updated {updated} articles.')
+
+    # CLI command: delete old read notifications
+    @app.cli.command('prune-notifications')
+    @click.option('--days', type=int, default=None, help='Keep read notifications newer than this (default NOTIFICATION_RETENTION_DAYS)')
+    def prune_notifications_command(days):
+        """Delete read notifications past the retention window"""
+        from .notifications import prune_notifications
+        days = days if days is not None else app.config['NOTIFICATION_RETENTION_DAYS']
+        click.echo(f'Deleted {prune_notifications(days)} read notifications older than {days} days.')
+
+    # CLI command: rebuild the full-text search index
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Re-index all articles for full-text search"""
+        from .search import rebuild_search_index
+        click.echo(f'Indexed {rebuild_search_index()} articles.')
+
+    # CLI command: fail when a hot query stops using an index
+    @app.cli.command('check-query-plans')
+    @click.option('--verbose', is_flag=True, default=False, help='Print the full plan for every query')
+    def check_query_plans_command(verbose):
+        """EXPLAIN the hot Article/Analytics/Notification queries and flag full scans"""
+        from .query_plans import check_query_plans
+        failures = 0
+        for name, plan, scans in check_query_plans():
+            status = 'FULL SCAN' if scans else 'ok'
+            click.echo(f'[{status}] {name}')
+            if scans or verbose:
+                for line in plan:
+                    click.echo(f'    {line}')
+            failures += bool(scans)
+        if failures:
+            click.echo(f'{failures} hot queries regressed to a full table scan.')
+            raise SystemExit(1)
+        click.echo('All hot queries use indexes.')
+
+    # CLI command: process queued article verifications
+    @app.cli.command('verify-worker')
+    @click.option('--concurrency', default=2, show_default=True, help='Number of jobs processed in parallel')
+    @click.option('--visibility-timeout', default=600, show_default=True,
+                  help='Seconds before a job held by a crashed worker is retried')
+    @click.option('--poll-interval', default=2.0, show_default=True, help='Seconds to wait when the queue is empty')
+    @click.option('--once', is_flag=True, default=False, help='Exit when the queue is empty')
+    @click.option('--email/--no-email', default=True, show_default=True,
+                  help='Also deliver the email outbox from this process')
+    def verify_worker(concurrency, visibility_timeout, poll_interval, once, email):
+        """Run the article verification worker pool"""
+        import threading
+        from .jobs import run_worker
+        from .mailer import run_email_worker
+        stop = threading.Event()
+        if email:
+            threading.Thread(target=run_email_worker, args=(app,),
+                             kwargs={'poll_interval': poll_interval, 'stop': stop},
+                             name='email-sender', daemon=True).start()
+        click.echo(f'Verification worker started with {concurrency} thread(s).')
+        try:
+            run_worker(app, concurrency=concurrency, visibility_timeout=visibility_timeout,
+                       poll_interval=poll_interval, once=once)
+        finally:
+            stop.set()
+
+    # CLI command: push spooled article images on this host without starting the web app
+    # (web processes drain the spool themselves from their first request on)
+    @app.cli.command('upload-worker')
+    def upload_worker():
+        """Upload every due spooled image on this host, then exit"""
+        from .uploads import uploader
+        click.echo(f'Uploaded {uploader.drain(app)} spooled images.')
+
+    # CLI command: fingerprinted, precompressed static assets (run at build time)
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """Minify CSS, write hashed copies with .gz/.br siblings and critical CSS to static/dist"""
+        from .assets import build_assets
+        manifest = build_assets(app)
+        for name, hashed in sorted(manifest['files'].items()):
+            click.echo(f'{name} -> {hashed}')
+        click.echo(f"Critical CSS for {len(manifest['critical'])} templates.")
+
+    # CLI command: responsive variants for images uploaded before the variant pipeline
+    @app.cli.command('build-image-variants')
+    def build_image_variants():
+        """Generate resized AVIF/WebP variants for locally stored article images"""
+        from .images import build_upload_variants
+        built, failed = build_upload_variants(app)
+        click.echo(f'Built variants for {built} images ({failed} failed).')
+
+    # CLI command: deliver queued email
+    @app.cli.command('email-worker')
+    @click.option('--batch-size', default=50, show_default=True, help='Messages sent per SMTP session round')
+    @click.option('--poll-interval', default=2.0, show_default=True, help='Seconds to wait when the outbox is empty')
+    @click.option('--once', is_flag=True, default=False, help='Exit when the outbox is empty')
+    def email_worker(batch_size, poll_interval, once):
+        """Send outbox email over a reused SMTP connection"""
+        from .mailer import run_email_worker, email_configured
+        if not email_configured():
+            click.echo('SMTP_SERVER, SMTP_PORT and EMAIL_SENDER must be set.')
+            raise SystemExit(1)
+        click.echo('Email sender started.')
+        try:
+            run_email_worker(app, batch_size=batch_size, poll_interval=poll_interval, once=once)
+        except KeyboardInterrupt:
+            pass
+
+    # CLI command: outbox delivery status
+    @app.cli.command('email-status')
+    def email_status():
+        """Show outbox counts per delivery status and recent failures"""
+        from .mailer import outbox_status
+        counts, failures = outbox_status()
+        for status in ('queued', 'sending', 'sent', 'failed'):
+            click.echo(f'{status:<8} {counts.get(status, 0)}')
+        for message in failures:
+            click.echo(f'#{message.id} {message.status} to {message.to_address} '
+                       f'(attempt {message.attempts}/{message.max_attempts}): {message.last_error}')
+
+    # CLI command: report or clear the credibility search-result cache
+    @app.cli.command('search-cache-stats')
+    @click.option('--clear', is_flag=True, default=False, help='Remove all cached search pages')
+    def search_cache_stats(clear):
+        """Show hit/miss counters for the credibility search cache"""
+        from .scraper import search_cache
+        if clear:
+            search_cache.clear()
+            click.echo('Search cache cleared.')
             return
-        click.echo('Approved Articles Digest:')
-        for art in arts:
-            link = url_for('articles.view_article', id=art.id, _external=True)
-            click.echo(f"- {art.title}: {link}")
+        stats = search_cache.stats()
+        lookups = stats['hits'] + stats['misses']
+        hit_rate = (stats['hits'] / lookups * 100) if lookups else 0
+        click.echo(f"Entries: {stats['entries']}")
+        click.echo(f"Hits: {stats['hits']}  Misses: {stats['misses']}  Hit rate: {hit_rate:.1f}%")
 
     # Add context processor for footer statistics
     @app.context_processor
     def inject_footer_stats():
-        """Inject footer statistics into all templates"""
-        try:
-            from .models import Article, User
-            total_articles = Article.query.filter_by(status='approved').count()
-            total_users = User.query.count()
-            return {
-                'total_articles': total_articles,
-                'total_users': total_users
-            }
-        except Exception:
-            # Return default values if database is not available
-            return {
-                'total_articles': 0,
-                'total_users': 0
-            }
+        """Inject footer statistics into all templates (cached for VISITOR_CACHE_TIMEOUT)"""
+        from .models import Article, User
+        return {
+            'total_articles': stats_cache.get('total_articles',
+                                              lambda: Article.query.filter_by(status='approved').count()),
+            'total_users': stats_cache.get('total_users', lambda: User.query.count())
+        }
 
     def get_visitor_count():
         """Get total unique visitors count from VisitorStats and Analytics"""
-        try:
-            from .models import VisitorStats, Analytics
-            from sqlalchemy import func
-            # Get total unique daily visitors
-            unique_visitors = VisitorStats.query.with_entities(func.count(func.distinct(VisitorStats.ip_address))).scalar()
-            # Add visit events from Analytics as a fallback
-            analytics_visits = Analytics.query.filter_by(event_type='visit').with_entities(func.count(func.distinct(Analytics.ip_address))).scalar()
-            
-            # Combine both counts, but ensure we don't double count
-            total_visitors = unique_visitors + (analytics_visits or 0)
-            return total_visitors
-        except Exception:
-            return 0
+        from .models import VisitorStats, Analytics
+        from sqlalchemy import func
+        # Get total unique daily visitors
+        unique_visitors = VisitorStats.query.with_entities(func.count(func.distinct(VisitorStats.ip_address))).scalar()
+        # Add visit events from Analytics as a fallback
+        analytics_visits = Analytics.query.filter_by(event_type='visit').with_entities(func.count(func.distinct(Analytics.ip_address))).scalar()
+        
+        # Combine both counts, but ensure we don't double count
+        total_visitors = (unique_visitors or 0) + (analytics_visits or 0)
+        return total_visitors
 
     @app.context_processor
     def utility_processor():
         return {
             'current_year': datetime.now().year,
-            'visitors_count': get_visitor_count()
+            'visitors_count': stats_cache.get('visitors_count', get_visitor_count)
         }
 
     return app
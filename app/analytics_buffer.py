@@ -0,0 +1,153 @@
+import atexit
+import logging
+import threading
+from collections import Counter, deque
+from datetime import datetime
+
+from sqlalchemy import insert, update, bindparam
+from sqlalchemy.exc import DisconnectionError, IntegrityError, OperationalError, TimeoutError as PoolTimeoutError
+from . import db
+
+logger = logging.getLogger(__name__)
+
+class AnalyticsBuffer:
+    """
+    In-process buffer for Analytics events.
+    Requests only append to memory; a background thread writes the events in bulk
+    (executemany) once flush_size events are waiting or every flush_interval seconds,
+    and once more when the process exits. When max_size events are pending, new
+    events are dropped and counted rather than blocking the request.
+    """
+
+    def __init__(self, flush_size=200, flush_interval=5.0, max_size=10000):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self.dropped = 0
+        self.written = 0
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._app = None
+
+    def init_app(self, app):
+        self._app = app
+        self.flush_size = app.config.get('ANALYTICS_FLUSH_SIZE', self.flush_size)
+        self.flush_interval = app.config.get('ANALYTICS_FLUSH_INTERVAL', self.flush_interval)
+        self.max_size = app.config.get('ANALYTICS_BUFFER_MAX', self.max_size)
+        atexit.register(self.flush)
+
+    def record(self, event_type, article_id=None, user_id=None, ip_address=None):
+        """Queue an event for the next bulk insert"""
+        event = {
+            'event_type': event_type,
+            'article_id': article_id,
+            'user_id': user_id,
+            'ip_address': ip_address,
+            'timestamp': datetime.utcnow()
+        }
+        with self._lock:
+            if len(self._events) >= self.max_size:
+                self.dropped += 1
+                if self.dropped % 1000 == 1:
+                    logger.warning(f"Analytics buffer full; {self.dropped} events dropped so far")
+                self._wakeup.set()
+                return
+            self._events.append(event)
+            pending = len(self._events)
+            self._ensure_thread()
+        if pending >= self.flush_size:
+            self._wakeup.set()
+
+    def _ensure_thread(self):
+        # Started lazily so each forked gunicorn worker gets its own flusher
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='analytics-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Analytics flush failed")
+
+    def flush(self):
+        """Write all pending events in one transaction"""
+        if self._app is None:
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._events)
+                self._events.clear()
+            if not batch:
+                return 0
+            with self._app.app_context():
+                try:
+                    try:
+                        self._write(batch)
+                    except IntegrityError:
+                        # An article or user was deleted after the event was recorded
+                        db.session.rollback()
+                        batch = self._drop_orphans(batch)
+                        self._write(batch)
+                    self.written += len(batch)
+                except (OperationalError, DisconnectionError, PoolTimeoutError):
+                    db.session.rollback()
+                    # Put the batch back so a transient DB error does not lose events
+                    with self._lock:
+                        room = max(self.max_size - len(self._events), 0)
+                        self._events.extendleft(reversed(batch[:room]))
+                        self.dropped += max(len(batch) - room, 0)
+                    raise
+                except Exception:
+                    # Retrying a batch the database rejects would fail on every flush forever
+                    db.session.rollback()
+                    self.dropped += len(batch)
+                    logger.exception(f"Dropping {len(batch)} analytics events the database rejected")
+                    return 0
+                finally:
+                    db.session.remove()
+            return len(batch)
+
+    def _write(self, batch):
+        from .models import Analytics, Article
+        if not batch:
+            return
+        db.session.execute(insert(Analytics), batch)
+        # Apply the denormalized view counters in the same transaction
+        views = Counter(e['article_id'] for e in batch if e['event_type'] == 'view' and e['article_id'])
+        if views:
+            article = Article.__table__
+            db.session.execute(
+                update(article)
+                .where(article.c.id == bindparam('b_id'))
+                .values(views=db.func.coalesce(article.c.views, 0) + bindparam('b_count')),
+                [{'b_id': article_id, 'b_count': count} for article_id, count in views.items()]
+            )
+        db.session.commit()
+
+    def _drop_orphans(self, batch):
+        """Drop events for deleted articles; keep those of deleted users, without the user"""
+        from .models import Article, User
+        ids = {e['article_id'] for e in batch if e['article_id']}
+        existing = {row[0] for row in db.session.query(Article.id).filter(Article.id.in_(ids))} if ids else set()
+        kept = [e for e in batch if not e['article_id'] or e['article_id'] in existing]
+        self.dropped += len(batch) - len(kept)
+        user_ids = {e['user_id'] for e in kept if e['user_id']}
+        users = {row[0] for row in db.session.query(User.id).filter(User.id.in_(user_ids))} if user_ids else set()
+        return [e if not e['user_id'] or e['user_id'] in users else dict(e, user_id=None) for e in kept]
+
+    def pending(self):
+        with self._lock:
+            return len(self._events)
+
+analytics_buffer = AnalyticsBuffer()
+
+def record_event(event_type, article_id=None, user_id=None, ip_address=None):
+    """Record an Analytics event without touching the request's DB session"""
+    analytics_buffer.record(event_type, article_id=article_id, user_id=user_id, ip_address=ip_address)
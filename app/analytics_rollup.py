@@ -0,0 +1,173 @@
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, update, bindparam, func
+from sqlalchemy.exc import IntegrityError
+from . import db
+from .models import Analytics, AnalyticsHourly, AnalyticsDaily, Article, Category, RollupCheckpoint
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT = 'analytics'
+
+# Distinct-IP visitor counts can't be rebuilt from rollups, so these raw events are never compacted
+KEEP_RAW_EVENTS = ('visit',)
+# Seconds to leave the newest raw rows alone. Ids are handed out at INSERT, not at COMMIT,
+# so on Postgres a lower id can become visible after a higher one; once a row was inserted
+# this long ago, every transaction that took an earlier id has finished. Measured on
+# Analytics.inserted_at (database clock), not the event timestamp, which buffered or
+# re-queued events carry from long before their INSERT. Twice ANALYTICS_FLUSH_INTERVAL.
+SAFETY_LAG = 10.0
+
+def _checkpoint():
+    cp = db.session.get(RollupCheckpoint, CHECKPOINT)
+    if cp is None:
+        cp = RollupCheckpoint(name=CHECKPOINT, last_id=0)
+        db.session.add(cp)
+        db.session.commit()
+    return cp
+
+def last_processed_id():
+    cp = db.session.get(RollupCheckpoint, CHECKPOINT)
+    return cp.last_id if cp else 0
+
+def last_aggregated_at():
+    cp = db.session.get(RollupCheckpoint, CHECKPOINT)
+    return cp.updated_at if cp else None
+
+def _merge(model, time_col, counts):
+    """Add counts {(time, event_type, article_id, category_id): n} into a rollup table"""
+    if not counts:
+        return
+    column = getattr(model, time_col)
+    existing = {
+        (getattr(row, time_col), row.event_type, row.article_id, row.category_id): row.id
+        for row in db.session.query(model.id, column, model.event_type, model.article_id, model.category_id)
+        .filter(column.in_({key[0] for key in counts}), model.event_type.in_({key[1] for key in counts}))
+    }
+    updates = [{'b_id': existing[key], 'b_n': n} for key, n in counts.items() if key in existing]
+    inserts = [
+        {time_col: key[0], 'event_type': key[1], 'article_id': key[2], 'category_id': key[3], 'count': n}
+        for key, n in counts.items() if key not in existing
+    ]
+    table = model.__table__
+    if updates:
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('b_id')).values(count=table.c.count + bindparam('b_n')),
+            updates
+        )
+    if inserts:
+        db.session.execute(insert(model), inserts)
+
+def _database_now():
+    now = db.session.query(func.now()).scalar()
+    # PostgreSQL returns now() in the session time zone, which is how the column default stores it
+    return now.replace(tzinfo=None) if now.tzinfo else now
+
+def aggregate_analytics(batch_size=5000, safety_lag=SAFETY_LAG):
+    """
+    Fold raw Analytics events newer than the checkpoint into the hourly and daily rollups.
+    Each batch updates the rollups and advances the checkpoint in one transaction, so an
+    event is counted exactly once; a concurrent run loses the checkpoint race and rolls back.
+    Stops at the first row inserted less than `safety_lag` seconds ago, so the checkpoint
+    never passes an id whose transaction may still commit. Returns the number of raw events processed.
+    """
+    processed = 0
+    while True:
+        last_id = _checkpoint().last_id
+        rows = db.session.query(
+            Analytics.id, Analytics.timestamp, Analytics.inserted_at, Analytics.event_type,
+            Analytics.article_id, Article.category_id
+        ).outerjoin(Article, Article.id == Analytics.article_id)\
+            .filter(Analytics.id > last_id)\
+            .order_by(Analytics.id)\
+            .limit(batch_size).all()
+        now = datetime.utcnow()
+        horizon = _database_now() - timedelta(seconds=safety_lag)
+        settled = len(rows)
+        for i, row in enumerate(rows):
+            if row.inserted_at is not None and row.inserted_at >= horizon:
+                settled = i
+                break
+        caught_up = settled < len(rows)
+        rows = rows[:settled]
+        if not rows:
+            break
+        hourly, daily = Counter(), Counter()
+        for row in rows:
+            ts = row.timestamp or now
+            rest = (row.event_type, row.article_id or 0, row.category_id or 0)
+            hourly[(ts.replace(minute=0, second=0, microsecond=0),) + rest] += 1
+            daily[(ts.date(),) + rest] += 1
+        try:
+            _merge(AnalyticsHourly, 'bucket', hourly)
+            _merge(AnalyticsDaily, 'day', daily)
+            advanced = RollupCheckpoint.query\
+                .filter_by(name=CHECKPOINT, last_id=last_id)\
+                .update({'last_id': rows[-1].id, 'updated_at': now}, synchronize_session=False)
+        except IntegrityError:
+            advanced = False
+        if not advanced:
+            db.session.rollback()
+            logger.warning("Another analytics aggregation is running; stopping this one")
+            break
+        db.session.commit()
+        processed += len(rows)
+        if caught_up:
+            break
+    return processed
+
+def compact_raw_analytics(retention_days=90, batch_size=5000):
+    """
+    Delete raw events older than retention_days that are already in the rollups (at or
+    below the checkpoint, which aggregate_analytics keeps behind the safety lag).
+    Returns the number of rows deleted.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    last_id = last_processed_id()
+    deleted = 0
+    while True:
+        ids = [row.id for row in db.session.query(Analytics.id)
+               .filter(Analytics.id <= last_id, Analytics.timestamp < cutoff,
+                       Analytics.event_type.notin_(KEEP_RAW_EVENTS))
+               .order_by(Analytics.id).limit(batch_size)]
+        if not ids:
+            break
+        deleted += Analytics.query.filter(Analytics.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+    return deleted
+
+def rolled_up_total(event_type, since=None):
+    """Sum of an event type from the daily rollups, optionally from a date onward"""
+    query = db.session.query(func.coalesce(func.sum(AnalyticsDaily.count), 0))\
+        .filter(AnalyticsDaily.event_type == event_type)
+    if since is not None:
+        query = query.filter(AnalyticsDaily.day >= since)
+    return query.scalar()
+
+def event_total(event_type):
+    """Exact all-time count: the rollups plus raw events not aggregated yet (a primary-key range)"""
+    pending = Analytics.query\
+        .filter(Analytics.id > last_processed_id(), Analytics.event_type == event_type)\
+        .count()
+    return rolled_up_total(event_type) + pending
+
+def top_articles(event_type='view', limit=10):
+    """[(article_id, title, count)] from the daily rollups, skipping deleted articles"""
+    total = func.sum(AnalyticsDaily.count).label('total')
+    return db.session.query(Article.id, Article.title, total)\
+        .join(Article, Article.id == AnalyticsDaily.article_id)\
+        .filter(AnalyticsDaily.event_type == event_type)\
+        .group_by(Article.id, Article.title)\
+        .order_by(total.desc())\
+        .limit(limit).all()
+
+def views_by_category(event_type='view'):
+    """[(category name, count)] from the daily rollups"""
+    total = func.sum(AnalyticsDaily.count).label('total')
+    return db.session.query(Category.name, total)\
+        .join(Category, Category.id == AnalyticsDaily.category_id)\
+        .filter(AnalyticsDaily.event_type == event_type)\
+        .group_by(Category.name)\
+        .order_by(total.desc()).all()
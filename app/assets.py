@@ -0,0 +1,289 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import Response, current_app, request, send_from_directory, url_for
+from jinja2 import pass_context
+from markupsafe import Markup
+
+# Output name -> source files (relative to the static folder), concatenated in order
+BUNDLES = {
+    'css/style.css': ['css/style.css'],
+}
+# Other static files served under a content-hashed name
+FINGERPRINTED = ['YothTimesFavicon.ico']
+# Larger critical CSS is not worth inlining into every page; the template links the bundle instead
+CRITICAL_CSS_LIMIT = 14 * 1024
+COMPRESSIBLE = ('.css', '.js', '.svg', '.ico', '.json', '.webmanifest')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_STRING = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+_STRING_OR_COMMENT = re.compile(rf'({_STRING})|/\*.*?\*/', re.S)
+
+def minify_css(css):
+    """Strip comments and redundant whitespace, leaving string literals untouched"""
+    css = _STRING_OR_COMMENT.sub(lambda m: m.group(1) or '', css)
+    parts = re.split(rf'({_STRING})', css)
+    # Odd indexes are the string literals
+    return ''.join(part if i % 2 else _squeeze(part) for i, part in enumerate(parts)).strip()
+
+def _squeeze(chunk):
+    chunk = re.sub(r'\s+', ' ', chunk)
+    chunk = re.sub(r'\s*([{};,])\s*', r'\1', chunk)
+    chunk = re.sub(r'(?<=[{;])([\w-]+)\s*:\s*', r'\1:', chunk)  # "color : red" -> "color:red"
+    return chunk.replace(';}', '}')
+
+_IMPORT = re.compile(r'@import\s+(?:url\((?:"[^"]*"|\'[^\']*\'|[^)]*)\)|"[^"]*"|\'[^\']*\')[^;]*;')
+
+def _hoist_imports(css):
+    # @import is only valid at the top of a stylesheet, so gather them from every bundled file
+    return '\n'.join(_IMPORT.findall(css)) + '\n' + _IMPORT.sub('', css)
+
+# --- Critical CSS -----------------------------------------------------------
+
+def _split_blocks(css):
+    """Yield (prelude, body) for each top-level block of minified CSS"""
+    depth = 0
+    start = 0
+    prelude = None
+    i = 0
+    while i < len(css):
+        ch = css[i]
+        if ch in '"\'':
+            i = css.index(ch, i + 1) + 1 if ch in css[i + 1:] else len(css)
+            continue
+        if ch == '{':
+            if depth == 0:
+                prelude = css[start:i]
+                start = i + 1
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                yield prelude.strip(), css[start:i]
+                start = i + 1
+        elif ch == ';' and depth == 0:
+            start = i + 1  # top-level @import/@charset
+        i += 1
+
+_PSEUDO = re.compile(r'::?[\w-]+(\((?:[^()]|\([^()]*\))*\))?')
+_CLASS = re.compile(r'\.((?:[\w-]|\\.)+)')
+_ID = re.compile(r'#((?:[\w-]|\\.)+)')
+_TAG = re.compile(r'(?:^|[\s>+~])([a-zA-Z][\w-]*)')
+
+def _selector_used(selector, used):
+    selector = re.sub(r'\[[^\]]*\]', '', _PSEUDO.sub('', selector))
+    classes = {c.replace('\\', '') for c in _CLASS.findall(selector)}
+    ids = {i.replace('\\', '') for i in _ID.findall(selector)}
+    tags = {t.lower() for t in _TAG.findall(selector)}
+    return classes <= used['classes'] and ids <= used['ids'] and tags <= used['tags']
+
+def critical_rules(css, used):
+    """Rules of minified `css` whose selectors can match the markup described by `used`"""
+    out = []
+    for prelude, body in _split_blocks(css):
+        if prelude.startswith('@media') or prelude.startswith('@supports'):
+            inner = critical_rules(body, used)
+            if inner:
+                out.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            continue  # @font-face, @keyframes: wait for the full stylesheet
+        elif any(_selector_used(sel, used) for sel in prelude.split(',')):
+            out.append(f'{prelude}{{{body}}}')
+    return ''.join(out)
+
+def _template_sources(template_dir, name, seen=None):
+    seen = seen if seen is not None else set()
+    path = os.path.join(template_dir, name)
+    if name in seen or not os.path.exists(path):
+        return []
+    seen.add(name)
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    sources = [source]
+    for parent in re.findall(r'{%-?\s*(?:extends|include)\s+["\']([^"\']+)["\']', source):
+        sources += _template_sources(template_dir, parent, seen)
+    return sources
+
+def used_selectors(template_dir, name):
+    """Class names, ids and tag names a template (with its parents and includes) can emit"""
+    used = {'classes': set(), 'ids': set(), 'tags': {'html', 'body'}}
+    for source in _template_sources(template_dir, name):
+        for value in re.findall(r'\bclass\s*=\s*["\']([^"\']*)["\']', source):
+            used['classes'].update(re.sub(r'{[{%#].*?[}%#]}', ' ', value).split())
+        used['ids'].update(re.findall(r'\bid\s*=\s*["\']([\w-]+)["\']', source))
+        used['tags'].update(t.lower() for t in re.findall(r'<([a-zA-Z][\w-]*)', source))
+    return used
+
+# --- Build ------------------------------------------------------------------
+
+def _write_compressed(path, data):
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, 9, mtime=0))
+    try:
+        import brotli
+    except ImportError:
+        return
+    with open(path + '.br', 'wb') as f:
+        f.write(brotli.compress(data, quality=11))
+
+def _emit(dist_dir, logical_name, data, compress=True):
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    stem, ext = os.path.splitext(logical_name)
+    hashed = f'{stem}.{digest}{ext}'
+    path = os.path.join(dist_dir, hashed)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    if compress and ext in COMPRESSIBLE:
+        _write_compressed(path, data)
+    return hashed
+
+def build_assets(app):
+    """
+    Minify and concatenate the CSS bundles, write content-hashed copies (plus .gz/.br)
+    and per-template critical CSS under static/dist, then swap in the new manifest.
+    Returns the manifest.
+    """
+    static_dir = app.static_folder
+    dist_dir = os.path.join(static_dir, 'dist')
+    build_dir = dist_dir + '.build'
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.makedirs(build_dir)
+    files = {}
+    bundled_css = {}
+    for name, sources in BUNDLES.items():
+        parts = []
+        for source in sources:
+            with open(os.path.join(static_dir, source), encoding='utf-8') as f:
+                parts.append(f.read())
+        css = minify_css(_hoist_imports('\n'.join(parts)))
+        bundled_css[name] = css
+        files[name] = 'dist/' + _emit(build_dir, name, css.encode())
+    for name in FINGERPRINTED:
+        with open(os.path.join(static_dir, name), 'rb') as f:
+            files[name] = 'dist/' + _emit(build_dir, name, f.read())
+
+    critical = {}
+    template_dir = os.path.join(app.root_path, app.template_folder)
+    css = ''.join(bundled_css.values())
+    for template in sorted(os.listdir(template_dir)):
+        if not template.endswith('.html'):
+            continue
+        rules = critical_rules(css, used_selectors(template_dir, template))
+        if rules and len(rules) <= CRITICAL_CSS_LIMIT:
+            critical[template] = 'dist/' + _emit(build_dir, f'critical/{template[:-5]}.css', rules.encode(),
+                                                 compress=False)  # Inlined, never requested
+
+    manifest = {'files': files, 'critical': critical}
+    with open(os.path.join(build_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    # Swap the whole directory so a running server never sees a half-written build
+    old_dir = dist_dir + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(dist_dir):
+        os.replace(dist_dir, old_dir)
+    os.replace(build_dir, dist_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    assets.load(app)
+    return manifest
+
+# --- Serving ----------------------------------------------------------------
+
+class Assets:
+    """
+    Maps logical static filenames to their fingerprinted copies. url_for('static', ...)
+    returns the hashed URL when the file was built, and those URLs are served with a
+    one-year immutable Cache-Control, preferring the .br/.gz sibling the client accepts.
+    Without a build, everything falls back to the plain static files.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.critical = {}
+        self._critical_css = {}
+        self._service_worker = None
+
+    def init_app(self, app):
+        self.load(app)
+        app.url_defaults(self._hashed_url)
+        app.add_url_rule(f'{app.static_url_path}/dist/<path:filename>', 'hashed_static', self.serve)
+        app.add_url_rule('/sw.js', 'service_worker', self.service_worker)
+        app.jinja_env.globals['critical_css'] = self.critical_css
+
+    def load(self, app):
+        path = os.path.join(app.static_folder, 'dist', 'manifest.json')
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        self.files = manifest.get('files', {})
+        self.critical = manifest.get('critical', {})
+        self._critical_css = {}
+        self._service_worker = None
+
+    def _hashed_url(self, endpoint, values):
+        if endpoint == 'static' and values.get('filename') in self.files:
+            values['filename'] = self.files[values['filename']]
+
+    def serve(self, filename):
+        dist_dir = os.path.join(current_app.static_folder, 'dist')
+        accepted = request.accept_encodings
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if accepted[encoding] and os.path.exists(os.path.join(dist_dir, filename + suffix)):
+                response = send_from_directory(dist_dir, filename + suffix, max_age=IMMUTABLE_MAX_AGE,
+                                               mimetype=mimetypes.guess_type(filename)[0])
+                response.content_encoding = encoding
+                break
+        else:
+            response = send_from_directory(dist_dir, filename, max_age=IMMUTABLE_MAX_AGE)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    def precache_urls(self):
+        """What the service worker stores on install: the offline page and every fingerprinted file"""
+        urls = [url_for('articles.offline')]
+        urls += [url_for('static', filename=name) for name in sorted(self.files)]
+        return urls
+
+    def service_worker(self):
+        """
+        static/sw.js with its precache manifest prepended. Served from the site root so it
+        controls every page, and revalidated on each check so new builds are picked up.
+        """
+        body = self._service_worker
+        if body is None:
+            with open(os.path.join(current_app.static_folder, 'sw.js'), encoding='utf-8') as f:
+                source = f.read()
+            urls = self.precache_urls()
+            version = hashlib.sha256((json.dumps(urls) + source).encode()).hexdigest()[:12]
+            manifest = json.dumps({'version': version, 'urls': urls})
+            body = self._service_worker = f'const PRECACHE_MANIFEST = {manifest};\n{source}'
+        response = Response(body, mimetype='text/javascript')
+        response.cache_control.no_cache = True
+        return response
+
+    @pass_context
+    def critical_css(self, context):
+        """Inlined critical CSS for the page being rendered, or '' when there is none"""
+        name = context.name
+        if name not in self.critical:
+            return ''
+        css = self._critical_css.get(name)
+        if css is None:
+            try:
+                with open(os.path.join(current_app.static_folder, self.critical[name]), encoding='utf-8') as f:
+                    css = f.read()
+            except OSError:
+                css = ''
+            self._critical_css[name] = css
+        return Markup(css.replace('</', '<\\/'))
+
+assets = Assets()
@@ -0,0 +1,79 @@
+import html
+import logging
+import threading
+
+import bleach
+import markdown
+
+# Configure allowed HTML tags and attributes for article bodies
+ALLOWED_TAGS = [
+    'p', 'br', 'strong', 'b', 'em', 'i', 'u', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'ul', 'ol', 'li', 'blockquote', 'a', 'img', 'code', 'pre', 'span', 'div',
+    'table', 'thead', 'tbody', 'tr', 'th', 'td'
+]
+
+ALLOWED_ATTRIBUTES = {
+    'a': ['href', 'title', 'target'],
+    'img': ['src', 'alt', 'title', 'width', 'height'],
+    'span': ['class'],
+    'div': ['class'],
+    'table': ['class'],
+    'th': ['class'],
+    'td': ['class']
+}
+
+EXCERPT_LENGTH = 300  # Longest excerpt any listing shows; shorter ones are cut from plain_text
+
+# Markdown instances are expensive to build and not thread-safe, so keep one per thread
+_converters = threading.local()
+
+def _markdown_converter():
+    md = getattr(_converters, 'md', None)
+    if md is None:
+        md = markdown.Markdown(extensions=[
+            'fenced_code',
+            'tables',
+            'nl2br',
+            'codehilite'
+        ])
+        _converters.md = md
+    return md
+
+def process_article_content(content):
+    """Process article content to support both Markdown and HTML safely"""
+    try:
+        # First, convert Markdown to HTML
+        md = _markdown_converter()
+        md.reset()
+        html_content = md.convert(content)
+
+        # Then sanitize the HTML to prevent XSS
+        return bleach.clean(
+            html_content,
+            tags=ALLOWED_TAGS,
+            attributes=ALLOWED_ATTRIBUTES,
+            strip=True
+        )
+    except Exception as e:
+        # Fallback to simple HTML escaping if markdown processing fails
+        logging.warning(f"Markdown processing failed: {e}")
+        return bleach.clean(content, tags=['p', 'br', 'strong', 'em'], strip=True)
+
+def html_to_text(html_content):
+    """Strip tags and collapse whitespace, leaving readable plain text"""
+    if not html_content:
+        return ''
+    return ' '.join(html.unescape(bleach.clean(html_content, tags=[], strip=True)).split())
+
+def truncate_text(text, max_length):
+    """Cut plain text at a word boundary and add an ellipsis"""
+    if len(text) > max_length:
+        return text[:max_length].rsplit(' ', 1)[0] + '...'
+    return text
+
+def create_excerpt(html_content, max_length=200):
+    """Create a plain text excerpt from HTML content"""
+    try:
+        return truncate_text(html_to_text(html_content), max_length)
+    except Exception:
+        return html_content[:max_length] + '...' if len(html_content) > max_length else html_content
@@ -0,0 +1,122 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import url_for
+from sqlalchemy.orm import load_only
+from . import db
+from .content import truncate_text
+from .mailer import SMTPConnection, smtp_settings, queue_email
+from .models import Article, DigestEdition, Newsletter
+
+logger = logging.getLogger(__name__)
+
+def render_digest(app, days=7, limit=20):
+    """Render the digest subject and plain-text body once for the whole edition"""
+    since = datetime.utcnow() - timedelta(days=days)
+    articles = Article.query\
+        .options(load_only(Article.id, Article.title, Article.excerpt, Article.plain_text, Article.created_at))\
+        .filter(Article.status == 'approved', Article.created_at >= since)\
+        .order_by(Article.created_at.desc(), Article.id.desc())\
+        .limit(limit).all()
+    if not articles:
+        return None, None, 0
+    lines = [f"This week on Youth Times ({len(articles)} new {'story' if len(articles) == 1 else 'stories'}):", '']
+    with app.test_request_context(base_url=app.config['SITE_URL']):
+        for art in articles:
+            link = url_for('articles.view_article', id=art.id, _external=True)
+            lines += [art.title.upper(), truncate_text(art.excerpt or art.plain_text or '', 200), link, '']
+        lines.append(f"Read more at {url_for('articles.articles_list', _external=True)}")
+    subject = f"Youth Times Digest - {datetime.utcnow().strftime('%B %d, %Y')}"
+    return subject, '\n'.join(lines), len(articles)
+
+def _subscriber_chunks(after_id, chunk_size):
+    """Yield lists of (id, email) for active subscribers, keyset-paged by id so memory stays flat"""
+    while True:
+        chunk = db.session.query(Newsletter.id, Newsletter.email)\
+            .filter(Newsletter.is_active == True, Newsletter.id > after_id)\
+            .order_by(Newsletter.id)\
+            .limit(chunk_size).all()  # noqa: E712
+        if not chunk:
+            return
+        yield chunk
+        after_id = chunk[-1].id
+
+class _ConnectionPool:
+    """One reused SMTP connection per sender thread"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._local = threading.local()
+        self._all = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = SMTPConnection(self.settings)
+            with self._lock:
+                self._all.append(conn)
+        return conn
+
+    def close(self):
+        for conn in self._all:
+            conn.close()
+
+def _send_one(pool, address, subject, body, attempts=2):
+    for attempt in range(attempts):
+        try:
+            pool.get().send(address, subject, body)
+            return True
+        except Exception as e:
+            pool.get().close()
+            logger.warning(f"Digest to {address} failed (attempt {attempt + 1}): {e}")
+    return False
+
+def send_digest(app, days=7, limit=20, chunk_size=200, concurrency=4, echo=print):
+    """
+    Send the digest to every active subscriber. An unfinished edition is resumed from its
+    checkpoint instead of starting over; at most the chunk in flight during a crash is resent.
+    Addresses that keep failing are handed to the email outbox for retries with backoff.
+    """
+    edition = DigestEdition.query.filter_by(status='sending').order_by(DigestEdition.id.desc()).first()
+    if edition:
+        echo(f"Resuming digest #{edition.id} after subscriber {edition.last_subscriber_id}.")
+    else:
+        subject, body, count = render_digest(app, days, limit)
+        if not body:
+            echo('No new approved articles; no digest sent.')
+            return None
+        edition = DigestEdition(subject=subject, body=body, article_count=count)
+        db.session.add(edition)
+        db.session.commit()
+        echo(f"Created digest #{edition.id} with {count} articles.")
+
+    edition_id, subject, body = edition.id, edition.subject, edition.body
+    pool = _ConnectionPool(smtp_settings())
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='digest') as executor:
+            for chunk in _subscriber_chunks(edition.last_subscriber_id, chunk_size):
+                results = list(executor.map(lambda sub: _send_one(pool, sub.email, subject, body), chunk))
+                failed = [sub.email for sub, ok in zip(chunk, results) if not ok]
+                for address in failed:
+                    queue_email(address, subject, body)
+                # Checkpoint and outbox hand-off commit together
+                DigestEdition.query.filter_by(id=edition_id).update({
+                    'last_subscriber_id': chunk[-1].id,
+                    'sent_count': DigestEdition.sent_count + (len(chunk) - len(failed)),
+                    'deferred_count': DigestEdition.deferred_count + len(failed),
+                }, synchronize_session=False)
+                db.session.commit()
+                # Release the identity map between chunks so memory stays flat
+                db.session.expunge_all()
+    finally:
+        pool.close()
+
+    DigestEdition.query.filter_by(id=edition_id).update(
+        {'status': 'done', 'finished_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    edition = db.session.get(DigestEdition, edition_id)
+    echo(f"Digest #{edition_id} done: {edition.sent_count} sent, {edition.deferred_count} deferred to the outbox.")
+    return edition
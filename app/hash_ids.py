@@ -0,0 +1,64 @@
+import os
+import secrets
+import threading
+import time
+
+# ASCII order, so string comparison of equal-length ids follows numeric order
+ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+TIME_CHARS = 9   # Milliseconds since the epoch; 62**9 ms lasts until the year 14000+
+SEQ_CHARS = 3    # Ids per millisecond per process before waiting for the next one
+NODE_CHARS = 8   # Random per process (~47 bits), so processes never need to coordinate
+MAX_SEQ = 62 ** SEQ_CHARS - 1
+
+def _base62(value, width):
+    chars = []
+    for _ in range(width):
+        value, rem = divmod(value, 62)
+        chars.append(ALPHABET[rem])
+    return ''.join(reversed(chars))
+
+class HashIdGenerator:
+    """
+    Time-ordered 20-character base62 ids: millisecond timestamp + per-process sequence +
+    random process tag. Unique without a database lookup, and new ids sort after old
+    ones so inserts land at the end of the unique index instead of at random pages.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._node = None
+        self._last_ms = 0
+        self._seq = 0
+
+    def _reset_if_forked(self):
+        # A forked worker must not share its parent's tag and sequence
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._node = ''.join(secrets.choice(ALPHABET) for _ in range(NODE_CHARS))
+            self._last_ms = 0
+            self._seq = 0
+
+    def _next(self):
+        now = time.time_ns() // 1_000_000
+        if now > self._last_ms:
+            self._last_ms, self._seq = now, 0
+        elif self._seq < MAX_SEQ:
+            # Same millisecond, or the clock stepped back: keep counting from the last time
+            self._seq += 1
+        else:
+            self._last_ms, self._seq = self._last_ms + 1, 0
+        return _base62(self._last_ms, TIME_CHARS) + _base62(self._seq, SEQ_CHARS) + self._node
+
+    def new(self):
+        with self._lock:
+            self._reset_if_forked()
+            return self._next()
+
+    def bulk(self, count):
+        """`count` ids in ascending order, for imports that build many articles at once"""
+        with self._lock:
+            self._reset_if_forked()
+            return [self._next() for _ in range(count)]
+
+hash_ids = HashIdGenerator()
@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+VERSION_NAME = 'identity'
+
+class UserSnapshot:
+    """
+    Lightweight stand-in for the logged-in User, built from the identity cache.
+    id, username, role and is_super_admin are answered without touching the database;
+    any other attribute (profile fields, password, relationships) loads the full User
+    row once per request and is read from or written to it.
+    """
+    __slots__ = ('id', 'username', 'role', 'is_super_admin', '_user')
+
+    def __init__(self, id, username, role, is_super_admin, user=None):
+        object.__setattr__(self, 'id', id)
+        object.__setattr__(self, 'username', username)
+        object.__setattr__(self, 'role', role)
+        object.__setattr__(self, 'is_super_admin', bool(is_super_admin))
+        object.__setattr__(self, '_user', user)
+
+    # Flask-Login user interface
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def get_id(self):
+        return str(self.id)
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin' or self.is_super_admin
+
+    def _load(self):
+        user = self._user
+        if user is None:
+            from .models import User
+            user = db.session.get(User, self.id)
+            object.__setattr__(self, '_user', user)
+        return user
+
+    def __getattr__(self, name):
+        # Only reached for attributes outside the snapshot
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+        if name in ('username', 'role', 'is_super_admin'):
+            object.__setattr__(self, name, value)
+            identity_cache.forget(self.id)
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id and hasattr(other, 'get_id')
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f'<UserSnapshot {self.id} {self.username!r}>'
+
+class IdentityCache:
+    """
+    Per-process map of user id -> (id, username, role, is_super_admin), kept for `ttl`
+    seconds so authenticated requests skip the User SELECT. Admins are never cached, so
+    a demotion takes effect on their next request in every process. For everyone else,
+    invalidate() bumps the shared 'identity' ContentVersion; each process re-reads it
+    every `version_poll` seconds and drops all its entries when it changed.
+    """
+
+    def __init__(self, ttl=60, max_entries=10000, version_poll=2.0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_poll = version_poll
+        self._entries = {}  # user_id -> (fields, expires_at)
+        self._version = None
+        self._version_checked_at = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('IDENTITY_CACHE_TTL', self.ttl)
+        self.version_poll = app.config.get('IDENTITY_VERSION_POLL', self.version_poll)
+
+    def _check_version(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._version_checked_at is not None and now - self._version_checked_at < self.version_poll:
+                return
+        from .models import ContentVersion
+        try:
+            version = ContentVersion.current(VERSION_NAME)
+        except Exception as e:
+            logger.warning(f"Could not read identity cache version: {e}")
+            db.session.rollback()
+            self.clear()
+            return
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            self._version_checked_at = now
+
+    def load(self, user_id):
+        """Return a UserSnapshot for user_id, or None if the user does not exist"""
+        self._check_version()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry and entry[1] > now:
+            return UserSnapshot(*entry[0])
+        from .models import User
+        user = db.session.get(User, user_id)
+        if user is None:
+            self.forget(user_id)
+            return None
+        fields = (user.id, user.username, user.role, bool(user.is_super_admin))
+        if user.role != 'admin' and not user.is_super_admin:
+            with self._lock:
+                if len(self._entries) >= self.max_entries:
+                    self._entries = {k: v for k, v in self._entries.items() if v[1] > now}
+                    if len(self._entries) >= self.max_entries:
+                        self._entries.clear()
+                self._entries[user_id] = (fields, now + self.ttl)
+        # This request already has the full row, so hand it over
+        return UserSnapshot(*fields, user=user)
+
+    def forget(self, user_id):
+        """Drop user_id from this process only"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def invalidate(self, user_id):
+        """Drop user_id in every process; call after the change to the user is committed"""
+        self.forget(user_id)
+        from .models import ContentVersion
+        ContentVersion.bump(VERSION_NAME)
+        with self._lock:
+            self._version_checked_at = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+identity_cache = IdentityCache()
@@ -0,0 +1,186 @@
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+
+from flask import current_app
+from markupsafe import Markup, escape
+from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (320, 640, 960, 1280)
+AVATAR_SIZE = 150
+PLACEHOLDER_WIDTH = 16
+
+# Newest first: browsers take the first <source> they support
+VARIANT_FORMATS = [fmt for fmt, available in (('avif', features.check('avif')), ('webp', features.check('webp')))
+                   if available]
+_SAVE_OPTIONS = {'avif': {'quality': 55}, 'webp': {'quality': 78, 'method': 4}}
+
+# Manifests by source URL, and avatar files known to exist (both per process)
+_manifests = {}
+_avatars = set()
+_lock = threading.Lock()
+
+def _cache_dir(app=None):
+    app = app or current_app
+    return app.config['IMAGE_CACHE_DIR']
+
+def _cache_url(name, app=None):
+    app = app or current_app
+    return f'{app.static_url_path}/img_cache/{name}'
+
+def _write_atomic(path, data):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def _index_path(source_url, app=None):
+    key = hashlib.sha1(source_url.encode()).hexdigest()
+    return os.path.join(_cache_dir(app), 'index', f'{key}.json')
+
+def build_variants(source_path, source_url, app=None):
+    """
+    Write resized AVIF/WebP variants and a blur placeholder for an image, named by the
+    hash of its content so unchanged images are never re-encoded. Returns the manifest.
+    """
+    with open(source_path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    cache_dir = _cache_dir(app)
+    os.makedirs(os.path.join(cache_dir, 'index'), exist_ok=True)
+    manifest_path = os.path.join(cache_dir, f'{digest}.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    else:
+        image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        widths = sorted({w for w in VARIANT_WIDTHS if w < image.width} | {min(image.width, VARIANT_WIDTHS[-1])})
+        variants = {}
+        for fmt in VARIANT_FORMATS:
+            variants[fmt] = []
+            for width in widths:
+                name = f'{digest}-{width}.{fmt}'
+                path = os.path.join(cache_dir, name)
+                if not os.path.exists(path):
+                    height = round(image.height * width / image.width)
+                    buf = io.BytesIO()
+                    image.resize((width, height), Image.LANCZOS).save(buf, fmt.upper(), **_SAVE_OPTIONS[fmt])
+                    _write_atomic(path, buf.getvalue())
+                variants[fmt].append([name, width])
+        # Tiny blurred copy inlined as a data URI while the real image loads
+        tiny = image.convert('RGB').resize(
+            (PLACEHOLDER_WIDTH, max(round(image.height * PLACEHOLDER_WIDTH / image.width), 1)), Image.BILINEAR
+        ).filter(ImageFilter.GaussianBlur(1))
+        buf = io.BytesIO()
+        tiny.save(buf, 'WEBP' if 'webp' in VARIANT_FORMATS else 'PNG', quality=40)
+        mime = 'image/webp' if 'webp' in VARIANT_FORMATS else 'image/png'
+        manifest = {
+            'width': image.width,
+            'height': image.height,
+            'variants': variants,
+            'placeholder': f'data:{mime};base64,' + base64.b64encode(buf.getvalue()).decode(),
+        }
+        _write_atomic(manifest_path, json.dumps(manifest).encode())
+    _write_atomic(_index_path(source_url, app), json.dumps({'digest': digest}).encode())
+    with _lock:
+        _manifests[source_url] = manifest
+    return manifest
+
+def build_upload_variants(app):
+    """Build variants for every locally stored article image; returns (built, failed)"""
+    folder = os.path.join(app.config['LOCAL_UPLOAD_DIR'], 'articles')
+    built = failed = 0
+    for name in sorted(os.listdir(folder)) if os.path.isdir(folder) else []:
+        if name.startswith('.'):
+            continue
+        try:
+            build_variants(os.path.join(folder, name), f'{app.static_url_path}/uploads/articles/{name}', app)
+            built += 1
+        except Exception as e:
+            logger.warning(f"Could not build image variants for {name}: {e}")
+            failed += 1
+    return built, failed
+
+def _manifest_for(source_url):
+    with _lock:
+        if source_url in _manifests:
+            return _manifests[source_url]
+    manifest = None
+    try:
+        with open(_index_path(source_url)) as f:
+            digest = json.load(f)['digest']
+        with open(os.path.join(_cache_dir(), f'{digest}.json')) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError, KeyError):
+        pass
+    with _lock:
+        # Misses are remembered too; build_variants replaces the entry when it runs
+        _manifests[source_url] = manifest
+    return manifest
+
+_CLOUDINARY_UPLOAD = re.compile(r'^(https://res\.cloudinary\.com/[^/]+/image/upload/)(.*)$')
+
+def _srcset(urls):
+    return ', '.join(f'{url} {width}w' for url, width in urls)
+
+def responsive_image(url, alt='', sizes='100vw', class_='', loading='lazy'):
+    """
+    <picture> markup for an article image: AVIF/WebP srcsets from the local variant cache,
+    Cloudinary width transforms for Cloudinary URLs, or a plain lazy <img> otherwise.
+    """
+    if not url:
+        return Markup('')
+    attrs = f'alt="{escape(alt)}" class="{escape(class_)}" loading="{escape(loading)}" decoding="async"'
+    cloudinary = _CLOUDINARY_UPLOAD.match(url)
+    if cloudinary:
+        base, rest = cloudinary.groups()
+        srcset = _srcset((f'{base}w_{w},c_limit,f_auto,q_auto/{rest}', w) for w in VARIANT_WIDTHS)
+        return Markup(f'<img src="{escape(url)}" srcset="{srcset}" sizes="{escape(sizes)}" {attrs}>')
+    manifest = _manifest_for(url)
+    if not manifest:
+        return Markup(f'<img src="{escape(url)}" {attrs}>')
+    sources = ''.join(
+        f'<source type="image/{fmt}" srcset="{_srcset((_cache_url(name), w) for name, w in variants)}" '
+        f'sizes="{escape(sizes)}">'
+        for fmt, variants in manifest['variants'].items()
+    )
+    style = f"background-image:url('{manifest['placeholder']}');background-size:cover"
+    return Markup(
+        f'<picture>{sources}<img src="{escape(url)}" width="{manifest["width"]}" height="{manifest["height"]}" '
+        f'style="{style}" {attrs}></picture>'
+    )
+
+def _avatar_color(seed):
+    # Muted, readable background picked from the name so it stays stable per user
+    h = int(hashlib.md5(seed.encode()).hexdigest()[:6], 16)
+    return (80 + (h >> 16) % 120, 80 + (h >> 8 & 0xFF) % 120, 80 + (h & 0xFF) % 120)
+
+def initials_avatar_url(initials, seed, size=AVATAR_SIZE):
+    """URL of a locally generated initials avatar, rendered once and cached on disk"""
+    initials = (initials or 'U')[:2].upper()
+    color = _avatar_color(seed or initials)
+    fmt = 'webp' if 'webp' in VARIANT_FORMATS else 'png'
+    name = 'avatar-' + hashlib.sha1(f'{initials}|{color}|{size}'.encode()).hexdigest()[:16] + f'.{fmt}'
+    if name not in _avatars:
+        cache_dir = _cache_dir()
+        path = os.path.join(cache_dir, name)
+        if not os.path.exists(path):
+            os.makedirs(cache_dir, exist_ok=True)
+            image = Image.new('RGB', (size, size), color)
+            draw = ImageDraw.Draw(image)
+            font = ImageFont.load_default(size=size * 0.42)
+            draw.text((size / 2, size / 2), initials, fill=(255, 255, 255), font=font, anchor='mm')
+            buf = io.BytesIO()
+            image.save(buf, fmt.upper(), quality=85)
+            _write_atomic(path, buf.getvalue())
+        with _lock:
+            _avatars.add(name)
+    return _cache_url(name)
@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, and_
+from . import db
+from .models import Article, LogEntry, Notification, VerificationJob
+from .page_cache import page_cache
+from .scraper import verify_article
+from .search import remove_article
+
+logger = logging.getLogger(__name__)
+
+def enqueue_verification(article_id, max_attempts=3):
+    """
+    Queue a credibility check for an article.
+    The job is added to the current session so it commits together with the article.
+    """
+    job = VerificationJob(article_id=article_id, max_attempts=max_attempts)
+    db.session.add(job)
+    return job
+
+def _claimable(now):
+    """Queued jobs that are due, plus running jobs whose visibility timeout has lapsed and can be retried"""
+    return or_(
+        and_(VerificationJob.status == 'queued', VerificationJob.available_at <= now),
+        and_(VerificationJob.status == 'running', VerificationJob.locked_until < now,
+             VerificationJob.attempts < VerificationJob.max_attempts)
+    )
+
+def fail_abandoned(now):
+    """
+    Mark running jobs failed when their worker died on the last allowed attempt, so a
+    job that keeps killing its worker is not picked up again forever.
+    """
+    failed = VerificationJob.query.filter(
+        VerificationJob.status == 'running', VerificationJob.locked_until < now,
+        VerificationJob.attempts >= VerificationJob.max_attempts
+    ).update({
+        'status': 'failed', 'locked_until': None, 'finished_at': now,
+        'last_error': 'Visibility timeout lapsed on the last attempt'
+    }, synchronize_session=False)
+    if failed:
+        logger.warning(f"Marked {failed} abandoned verification job(s) failed")
+    return failed
+
+def claim_job(visibility_timeout=600):
+    """
+    Atomically claim the next due job. Safe across threads and processes: the claim is a
+    conditional UPDATE, so only one worker can move a given job into 'running'.
+    """
+    fail_abandoned(datetime.utcnow())
+    db.session.commit()
+    while True:
+        now = datetime.utcnow()
+        job_id = db.session.query(VerificationJob.id)\
+            .filter(_claimable(now))\
+            .order_by(VerificationJob.available_at, VerificationJob.id)\
+            .limit(1).scalar()
+        if job_id is None:
+            db.session.rollback()
+            return None
+        claimed = VerificationJob.query\
+            .filter(VerificationJob.id == job_id, _claimable(now))\
+            .update({
+                'status': 'running',
+                'attempts': VerificationJob.attempts + 1,
+                'locked_until': now + timedelta(seconds=visibility_timeout)
+            }, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return db.session.get(VerificationJob, job_id)
+        # Another worker won the race; try the next candidate
+
+def process_verification(article_id):
+    """Score an article and apply the trust threshold (auto-delete below 50%)"""
+    art = db.session.get(Article, article_id)
+    if not art:
+        return
+    score = verify_article(art.title, art.content)
+    if score < 50:
+        # Auto-delete low-trust articles
+        remove_article(article_id)
+        db.session.delete(art)
+        db.session.commit()
+        page_cache.bump()
+        # Log deletion action and notify user
+        entry = LogEntry(article_id=article_id, action=f"Auto-deleted (trust {score}%)")
+        db.session.add(entry)
+        db.session.commit()
+        notif = Notification(user_id=art.submitted_by, article_id=article_id,
+                             message=f"Your article '{art.title}' was automatically deleted (trust {score}%).")
+        db.session.add(notif)
+        db.session.commit()
+        logger.info(f"Article ID {article_id} automatically discarded (trust {score}%).")
+    else:
+        art.trust_score = score
+        db.session.commit()
+        # Log pending action and notify user
+        entry = LogEntry(article_id=article_id, action=f"Marked pending (trust {score}%)")
+        db.session.add(entry)
+        notif = Notification(user_id=art.submitted_by, article_id=article_id,
+                             message=f"Your article '{art.title}' passed authenticity check (trust {score}%) and is pending approval.")
+        db.session.add(notif)
+        db.session.commit()
+        logger.info(f"Article ID {article_id} marked pending with trust {score}%.")
+
+def run_job(job, retry_delay=30):
+    """Run a claimed job, retrying with exponential backoff until max_attempts is reached"""
+    job_id, article_id, attempts, max_attempts = job.id, job.article_id, job.attempts, job.max_attempts
+    try:
+        process_verification(article_id)
+        VerificationJob.query.filter_by(id=job_id).update({
+            'status': 'done', 'locked_until': None, 'finished_at': datetime.utcnow(), 'last_error': None
+        })
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.exception(f"Verification job {job_id} for article {article_id} failed (attempt {attempts})")
+        if attempts >= max_attempts:
+            update = {'status': 'failed', 'locked_until': None, 'finished_at': datetime.utcnow()}
+        else:
+            delay = retry_delay * (2 ** (attempts - 1))
+            update = {'status': 'queued', 'locked_until': None,
+                      'available_at': datetime.utcnow() + timedelta(seconds=delay)}
+        update['last_error'] = str(e)[:2000]
+        VerificationJob.query.filter_by(id=job_id).update(update)
+        db.session.commit()
+
+def run_worker(app, concurrency=2, visibility_timeout=600, poll_interval=2.0, once=False):
+    """
+    Process verification jobs with a fixed pool of worker threads.
+    With once=True each thread exits as soon as the queue is empty.
+    """
+    stop = threading.Event()
+
+    def _loop():
+        while not stop.is_set():
+            with app.app_context():
+                try:
+                    job = claim_job(visibility_timeout)
+                    if job:
+                        run_job(job)
+                        continue
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Verification worker error")
+                finally:
+                    db.session.remove()
+            if once:
+                return
+            stop.wait(poll_interval)
+
+    threads = [threading.Thread(target=_loop, name=f'verify-worker-{i}', daemon=True)
+               for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    try:
+        while any(t.is_alive() for t in threads):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        logger.info("Stopping verification workers after their current jobs...")
+        stop.set()
+        for t in threads:
+            t.join()
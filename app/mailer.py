@@ -0,0 +1,185 @@
+import logging
+import os
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+from email.mime.text import MIMEText
+
+from sqlalchemy import or_, and_, func
+from . import db
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+def smtp_settings():
+    """SMTP settings from the environment; username/password are optional (e.g. a local debugging server)"""
+    return {
+        'server': os.getenv('SMTP_SERVER'),
+        'port': int(os.getenv('SMTP_PORT') or 0),
+        'username': os.getenv('SMTP_USERNAME'),
+        'password': os.getenv('SMTP_PASSWORD'),
+        'sender': os.getenv('EMAIL_SENDER'),
+        'use_tls': os.getenv('SMTP_USE_TLS', 'true').lower() in ('true', '1', 'yes'),
+    }
+
+def email_configured():
+    settings = smtp_settings()
+    return bool(settings['server'] and settings['port'] and settings['sender'])
+
+def queue_email(to_address, subject, body, max_attempts=5):
+    """
+    Add a message to the outbox in the current session; it is sent once the caller commits.
+    Returns the OutboxEmail row.
+    """
+    message = OutboxEmail(to_address=to_address, subject=subject, body=body, max_attempts=max_attempts)
+    db.session.add(message)
+    return message
+
+class SMTPConnection:
+    """
+    One authenticated SMTP connection reused across messages. It is re-opened when the
+    server drops it and closed after `idle_timeout` seconds without traffic.
+    """
+
+    def __init__(self, settings, timeout=30, idle_timeout=60):
+        self.settings = settings
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._smtp = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        s = self.settings
+        smtp = smtplib.SMTP(s['server'], s['port'], timeout=self.timeout)
+        if s['use_tls']:
+            smtp.starttls()
+        if s['username'] and s['password']:
+            smtp.login(s['username'], s['password'])
+        return smtp
+
+    def send(self, to_address, subject, body):
+        msg = MIMEText(body)
+        msg['Subject'] = subject
+        msg['From'] = self.settings['sender']
+        msg['To'] = to_address
+        if self._smtp is None:
+            self._smtp = self._connect()
+        try:
+            self._smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # The server closed an idle connection; reconnect once and retry
+            self._smtp = self._connect()
+            self._smtp.send_message(msg)
+        self._last_used = time.monotonic()
+
+    def close_if_idle(self):
+        if self._smtp is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+def _claimable(now):
+    return or_(
+        and_(OutboxEmail.status == 'queued', OutboxEmail.available_at <= now),
+        and_(OutboxEmail.status == 'sending', OutboxEmail.locked_until < now)
+    )
+
+def claim_batch(batch_size=50, lock_timeout=300):
+    """Claim up to batch_size due messages; each claim is a conditional UPDATE, so senders never overlap"""
+    now = datetime.utcnow()
+    candidates = [row.id for row in db.session.query(OutboxEmail.id)
+                  .filter(_claimable(now))
+                  .order_by(OutboxEmail.available_at, OutboxEmail.id)
+                  .limit(batch_size)]
+    claimed = []
+    for message_id in candidates:
+        if OutboxEmail.query.filter(OutboxEmail.id == message_id, _claimable(now)).update({
+            'status': 'sending',
+            'attempts': OutboxEmail.attempts + 1,
+            'locked_until': now + timedelta(seconds=lock_timeout)
+        }, synchronize_session=False):
+            claimed.append(message_id)
+    db.session.commit()
+    if not claimed:
+        return []
+    return OutboxEmail.query.filter(OutboxEmail.id.in_(claimed)).order_by(OutboxEmail.id).all()
+
+def _extend_lock(message_id, attempt, lock_timeout):
+    """
+    Push locked_until forward for a message this sender still holds. False when the lock
+    lapsed and another sender re-claimed it (which bumped attempts), so it is theirs now.
+    """
+    extended = OutboxEmail.query.filter_by(id=message_id, status='sending', attempts=attempt).update(
+        {'locked_until': datetime.utcnow() + timedelta(seconds=lock_timeout)}, synchronize_session=False)
+    db.session.commit()
+    return bool(extended)
+
+def deliver_batch(connection, batch_size=50, retry_delay=60, lock_timeout=300):
+    """
+    Send one batch over the shared connection; returns the number of messages attempted.
+    A slow SMTP server can take longer than lock_timeout for the whole batch, so each
+    message's lock is renewed right before it is sent rather than trusted from the claim.
+    """
+    messages = claim_batch(batch_size, lock_timeout)
+    attempts = {message.id: message.attempts for message in messages}
+    for message in messages:
+        if not _extend_lock(message.id, attempts[message.id], lock_timeout):
+            logger.info(f"Email {message.id} was re-claimed by another sender; skipping it")
+            continue
+        try:
+            connection.send(message.to_address, message.subject, message.body)
+            message.status = 'sent'
+            message.sent_at = datetime.utcnow()
+            message.locked_until = None
+            message.last_error = None
+        except Exception as e:
+            # Drop the connection so the next message starts from a clean session
+            connection.close()
+            logger.warning(f"Email {message.id} to {message.to_address} failed (attempt {message.attempts}): {e}")
+            message.last_error = str(e)[:2000]
+            message.locked_until = None
+            if message.attempts >= message.max_attempts:
+                message.status = 'failed'
+            else:
+                message.status = 'queued'
+                message.available_at = datetime.utcnow() + timedelta(seconds=retry_delay * (2 ** (message.attempts - 1)))
+        db.session.commit()
+    return len(messages)
+
+def run_email_worker(app, batch_size=50, poll_interval=2.0, once=False, stop=None):
+    """Deliver outbox messages until stopped; with once=True exit when the outbox is empty"""
+    stop = stop or threading.Event()
+    connection = SMTPConnection(smtp_settings())
+    try:
+        while not stop.is_set():
+            with app.app_context():
+                try:
+                    sent = deliver_batch(connection, batch_size) if email_configured() else 0
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Email sender error")
+                    sent = 0
+                finally:
+                    db.session.remove()
+            if sent:
+                continue
+            if once:
+                return
+            connection.close_if_idle()
+            stop.wait(poll_interval)
+    finally:
+        connection.close()
+
+def outbox_status():
+    """Message counts per delivery status plus the most recent failures"""
+    counts = dict(db.session.query(OutboxEmail.status, func.count(OutboxEmail.id)).group_by(OutboxEmail.status).all())
+    failures = OutboxEmail.query.filter(OutboxEmail.last_error.isnot(None))\
+        .order_by(OutboxEmail.id.desc()).limit(10).all()
+    return counts, failures
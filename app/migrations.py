@@ -0,0 +1,163 @@
+from sqlalchemy import inspect, text
+from werkzeug.security import generate_password_hash
+from . import db
+
+# Ordered schema steps. Append new steps at the end and never renumber applied ones.
+# Each step is idempotent so it is safe on databases patched by older startup code.
+MIGRATIONS = []
+
+def migration(version, name):
+    def register(fn):
+        MIGRATIONS.append((version, name, fn))
+        return fn
+    return register
+
+def _columns(table):
+    return {col['name'] for col in inspect(db.engine).get_columns(table)}
+
+def _add_columns(table, columns):
+    existing = _columns(table)
+    for name, ddl in columns:
+        if name not in existing:
+            # Quoted because "user" is a reserved word on PostgreSQL
+            db.session.execute(text(f'ALTER TABLE "{table}" ADD COLUMN {name} {ddl}'))
+            print(f"✅ Added {table}.{name}")
+
+@migration(1, 'notification column names')
+def _notification_column_names():
+    cols = _columns('notification')
+    if 'read' in cols and 'is_read' not in cols:
+        db.session.execute(text('ALTER TABLE notification RENAME COLUMN read TO is_read'))
+        print("✅ Fixed notification.read -> notification.is_read")
+    if 'timestamp' not in cols and 'created_at' in cols:
+        db.session.execute(text('ALTER TABLE notification RENAME COLUMN created_at TO timestamp'))
+        print("✅ Fixed notification.created_at -> notification.timestamp")
+
+@migration(2, 'legacy article columns')
+def _legacy_article_columns():
+    missing_created_at = 'created_at' not in _columns('article')
+    _add_columns('article', [
+        ('trust_score', 'FLOAT'),
+        ('category_id', 'INTEGER'),
+        ('tags', 'VARCHAR(500)'),
+        ('image_url', 'VARCHAR(500)'),
+        # SQLite doesn't support non-constant defaults, so add column without default
+        ('created_at', 'TIMESTAMP'),
+    ])
+    if missing_created_at:
+        db.session.execute(text('UPDATE article SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL'))
+
+@migration(3, 'legacy user profile columns')
+def _legacy_user_columns():
+    _add_columns('user', [
+        ('name', 'VARCHAR(150)'),
+        ('bio', 'TEXT'),
+        ('email', 'VARCHAR(150)'),
+        ('profile_image', 'VARCHAR(200)'),
+        ('is_confirmed', 'BOOLEAN DEFAULT FALSE'),
+        ('is_super_admin', 'BOOLEAN DEFAULT FALSE'),
+    ])
+
+@migration(4, 'article view counter')
+def _article_views():
+    _add_columns('article', [('views', 'INTEGER DEFAULT 0')])
+
+@migration(5, 'article derived text columns')
+def _article_text_columns():
+    _add_columns('article', [
+        ('excerpt', 'VARCHAR(400)'),
+        ('plain_text', 'TEXT'),
+        ('word_count', 'INTEGER'),
+    ])
+
+@migration(6, 'full-text search index')
+def _full_text_search_index():
+    from .search import ensure_search_index, rebuild_search_index
+    if ensure_search_index():
+        print(f"✅ Built full-text search index ({rebuild_search_index()} articles)")
+
+@migration(7, 'drop timestamp indexes replaced by id ordering')
+def _drop_timestamp_indexes():
+    # The admin log and the notification inbox page on id since user-013; create_all
+    # never drops an index the models no longer declare
+    for name in ('ix_log_entry_timestamp', 'ix_notification_user_timestamp'):
+        db.session.execute(text(f'DROP INDEX IF EXISTS {name}'))
+
+@migration(8, 'analytics insert time')
+def _analytics_inserted_at():
+    if 'inserted_at' in _columns('analytics'):
+        return
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text('ALTER TABLE analytics ADD COLUMN inserted_at TIMESTAMP DEFAULT now()'))
+        print("✅ Added analytics.inserted_at")
+    else:
+        # SQLite can't add a column with a CURRENT_TIMESTAMP default. It doesn't need one:
+        # writers are serialized, so ids become visible in order and NULL counts as settled
+        _add_columns('analytics', [('inserted_at', 'TIMESTAMP')])
+
+DEFAULT_CATEGORIES = [
+    {'name': 'News', 'description': 'Latest campus and world news', 'color': '#EF4444'},
+    {'name': 'Sports', 'description': 'Sports coverage and updates', 'color': '#10B981'},
+    {'name': 'Opinion', 'description': 'Editorial and opinion pieces', 'color': '#8B5CF6'},
+    {'name': 'Arts & Culture', 'description': 'Arts, culture, and entertainment', 'color': '#F59E0B'},
+    {'name': 'Technology', 'description': 'Tech news and innovations', 'color': '#3B82F6'},
+    {'name': 'Lifestyle', 'description': 'Lifestyle and student life', 'color': '#EC4899'}
+]
+
+def seed_defaults():
+    """Insert default categories and the default super admin only when they are missing"""
+    from .models import Category, User
+    existing = {name for (name,) in db.session.query(Category.name)
+                .filter(Category.name.in_([c['name'] for c in DEFAULT_CATEGORIES]))}
+    for cat_data in DEFAULT_CATEGORIES:
+        if cat_data['name'] not in existing:
+            db.session.add(Category(**cat_data))
+            print(f"✅ Added category {cat_data['name']}")
+
+    # Default super admin for development; change the password after first login
+    admin_username = 'admin@dev'
+    if not db.session.query(User.id).filter_by(username=admin_username).first():
+        db.session.add(User(
+            username=admin_username,
+            password=generate_password_hash('admin@dev'),
+            role='admin',
+            is_confirmed=True,
+            email='admin@dev',
+            is_super_admin=True
+        ))
+        print(f"✅ Created default super admin '{admin_username}'")
+    db.session.commit()
+
+def current_version():
+    from .models import SchemaVersion
+    if not inspect(db.engine).has_table('schema_version'):
+        return 0
+    return db.session.query(db.func.max(SchemaVersion.version)).scalar() or 0
+
+def upgrade():
+    """
+    Bring the database up to date: create missing tables, apply pending steps in order,
+    create missing indexes and seed default data. Returns the list of applied step names.
+    """
+    from .models import SchemaVersion
+    from .query_plans import ensure_indexes
+
+    # New tables (and their indexes) come straight from the models
+    db.create_all()
+
+    applied = []
+    version = current_version()
+    for step_version, name, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if step_version <= version:
+            continue
+        fn()
+        db.session.add(SchemaVersion(version=step_version, name=name))
+        db.session.commit()
+        applied.append(f'{step_version}: {name}')
+
+    # Indexes declared on existing tables (create_all skips those)
+    for index_name in ensure_indexes():
+        print(f"✅ Created index {index_name}")
+
+    seed_defaults()
+    return applied
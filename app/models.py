@@ -2,8 +2,7 @@ from . import db
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
-import secrets
-import string
+from sqlalchemy.exc import IntegrityError
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -45,16 +44,22 @@ class User(db.Model, UserMixin):
                 initials = self.username[:2].upper()
             else:
                 initials = "U"
-            return f"https://via.placeholder.com/150x150/cccccc/666666?text={initials}"
+            from .images import initials_avatar_url
+            return initials_avatar_url(initials, self.username)
 
 class Article(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     hash_id = db.Column(db.String(20), unique=True, nullable=False)  # Unique hash identifier
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
+    # Derived from content on every write (see refresh_text_fields) so listings never re-sanitize HTML
+    excerpt = db.Column(db.String(400), nullable=True)
+    plain_text = db.Column(db.Text, nullable=True)
+    word_count = db.Column(db.Integer, nullable=True)
     status = db.Column(db.String(20), default='pending')  # pending, approved, rejected, published
     submitted_by = db.Column(db.Integer, db.ForeignKey('user.id'))
     credibility_score = db.Column(db.Float, nullable=True)  # Professional credibility rating 0-100
+    trust_score = db.Column(db.Float, nullable=True)  # Set by the verification worker
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=True)
     tags = db.Column(db.String(500), nullable=True)  # Comma-separated tags
     image_url = db.Column(db.String(500), nullable=True)
@@ -65,30 +70,52 @@ class Article(db.Model):
     author = db.relationship('User', foreign_keys=[author_id], backref='authored_articles')
     submitter = db.relationship('User', foreign_keys=[submitted_by], backref='submitted_articles')
     category = db.relationship('Category', backref='articles')
+
+    __table_args__ = (
+        db.Index('ix_article_status_created_at', 'status', 'created_at'),  # Listings, home, RSS
+        db.Index('ix_article_status_id', 'status', 'id'),  # Admin pending queue
+        db.Index('ix_article_category_status_created_at', 'category_id', 'status', 'created_at'),  # Category pages
+        db.Index('ix_article_submitted_by', 'submitted_by'),  # Profile article lists
+    )
     
     def __init__(self, **kwargs):
         super(Article, self).__init__(**kwargs)
         if not self.hash_id:
             self.hash_id = self.generate_hash_id()
     
-    def generate_hash_id(self):
-        """Generate a unique hash ID for the article"""
-        while True:
-            # Generate a 12-character hash using letters and numbers
-            hash_id = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(12))
-            # Ensure it doesn't already exist (but avoid querying during initialization)
-            try:
-                if not Article.query.filter_by(hash_id=hash_id).first():
-                    return hash_id
-            except:
-                # If we can't query (during initial creation), just return the hash
-                return hash_id
+    def refresh_text_fields(self):
+        """Recompute excerpt, plain_text and word_count from the HTML content"""
+        from .content import html_to_text, truncate_text, EXCERPT_LENGTH
+        self.plain_text = html_to_text(self.content)
+        self.excerpt = truncate_text(self.plain_text, EXCERPT_LENGTH)
+        self.word_count = len(self.plain_text.split())
+
+    @staticmethod
+    def generate_hash_id():
+        """Generate a unique, time-ordered hash ID for the article (no database lookup)"""
+        from .hash_ids import hash_ids
+        return hash_ids.new()
+
+    @staticmethod
+    def generate_hash_ids(count):
+        """Generate `count` hash IDs at once for bulk imports; pass them as Article(hash_id=...)"""
+        from .hash_ids import hash_ids
+        return hash_ids.bulk(count)
+
+@db.event.listens_for(Article, 'before_insert')
+def _article_before_insert(mapper, connection, target):
+    target.refresh_text_fields()
+
+@db.event.listens_for(Article, 'before_update')
+def _article_before_update(mapper, connection, target):
+    if db.inspect(target).attrs.content.history.has_changes():
+        target.refresh_text_fields()
 
 class LogEntry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     article_id = db.Column(db.Integer, db.ForeignKey('article.id', ondelete='CASCADE'), nullable=True)
     action = db.Column(db.String(100), nullable=False)
-    timestamp = db.Column(db.DateTime, default=db.func.now())
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     # Optionally link back to article
     article = db.relationship('Article', backref=db.backref('logs', cascade='all, delete-orphan'))
 
@@ -99,11 +126,18 @@ class Notification(db.Model):
     article_id = db.Column(db.Integer, db.ForeignKey('article.id', ondelete='CASCADE'), nullable=True)
     message = db.Column(db.String(200), nullable=False)
     is_read = db.Column(db.Boolean, default=False)
-    timestamp = db.Column(db.DateTime, default=db.func.now())
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     # Relationships
     user = db.relationship('User', backref='notifications')
     article = db.relationship('Article', backref=db.backref('notifications', cascade='all, delete-orphan'))
 
+    __table_args__ = (
+        db.Index('ix_notification_user_id', 'user_id', 'id'),  # Inbox, newest first
+        # Unread badge and mark-as-read only touch unread rows
+        db.Index('ix_notification_user_unread', 'user_id',
+                 postgresql_where=db.text('is_read = false'), sqlite_where=db.text('is_read = 0')),
+    )
+
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
@@ -120,6 +154,8 @@ class Comment(db.Model):
     article = db.relationship('Article', backref=db.backref('comments', cascade='all, delete-orphan'))
     user = db.relationship('User', backref='comments')
 
+    __table_args__ = (db.Index('ix_comment_article_created_at', 'article_id', 'created_at'),)
+
 class Like(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     article_id = db.Column(db.Integer, db.ForeignKey('article.id', ondelete='CASCADE'), nullable=False)
@@ -143,10 +179,83 @@ class Analytics(db.Model):
     event_type = db.Column(db.String(50), nullable=False)  # 'view', 'share', 'comment'
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     ip_address = db.Column(db.String(45), nullable=True)
-    timestamp = db.Column(db.DateTime, default=db.func.now())
+    timestamp = db.Column(db.DateTime, default=db.func.now())  # When the event happened
+    # When the row was written, by the database clock; buffered events arrive later than `timestamp`
+    inserted_at = db.Column(db.DateTime, server_default=db.func.now())
     article = db.relationship('Article', backref=db.backref('analytics', cascade='all, delete-orphan'))
     user = db.relationship('User', backref='analytics')
 
+    __table_args__ = (
+        db.Index('ix_analytics_article_event', 'article_id', 'event_type'),  # Per-article counts
+        db.Index('ix_analytics_event_timestamp', 'event_type', 'timestamp'),  # Dashboard windows
+    )
+
+class AnalyticsHourly(db.Model):
+    """Event counts per hour, article and category, built from Analytics by `flask aggregate-analytics`"""
+    __tablename__ = 'analytics_hourly'
+    id = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.DateTime, nullable=False)  # Start of the hour (UTC)
+    event_type = db.Column(db.String(50), nullable=False)
+    article_id = db.Column(db.Integer, nullable=False, default=0)  # 0 = not tied to an article; no FK so history survives deletes
+    category_id = db.Column(db.Integer, nullable=False, default=0)  # 0 = uncategorized
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('bucket', 'event_type', 'article_id', 'category_id', name='uq_analytics_hourly_key'),
+        db.Index('ix_analytics_hourly_event_bucket', 'event_type', 'bucket'),
+    )
+
+class AnalyticsDaily(db.Model):
+    """Event counts per day, article and category; the admin dashboard reads only this table"""
+    __tablename__ = 'analytics_daily'
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    event_type = db.Column(db.String(50), nullable=False)
+    article_id = db.Column(db.Integer, nullable=False, default=0)
+    category_id = db.Column(db.Integer, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('day', 'event_type', 'article_id', 'category_id', name='uq_analytics_daily_key'),
+        db.Index('ix_analytics_daily_event_day', 'event_type', 'day'),
+        db.Index('ix_analytics_daily_article_event', 'article_id', 'event_type'),
+    )
+
+class RollupCheckpoint(db.Model):
+    """Last raw Analytics id folded into the rollup tables"""
+    __tablename__ = 'rollup_checkpoint'
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=True)
+
+class ContentVersion(db.Model):
+    """
+    Named counters shared by every process: 'pages' is bumped on admin content changes
+    (cached anonymous pages are keyed by it), 'identity' on user role/account changes.
+    """
+    __tablename__ = 'content_version'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=True)
+
+    @classmethod
+    def current(cls, name):
+        return db.session.query(cls.version).filter_by(name=name).scalar() or 0
+
+    @classmethod
+    def bump(cls, name):
+        """Increment the counter and commit, creating the row on first use"""
+        values = {'version': cls.version + 1, 'updated_at': datetime.utcnow()}
+        try:
+            if not cls.query.filter_by(name=name).update(values, synchronize_session=False):
+                db.session.add(cls(name=name, version=1, updated_at=datetime.utcnow()))
+            db.session.commit()
+        except IntegrityError:
+            # Another process created the row first
+            db.session.rollback()
+            cls.query.filter_by(name=name).update(values, synchronize_session=False)
+            db.session.commit()
+
 class TickerMessage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     message = db.Column(db.String(500), nullable=False)
@@ -164,3 +273,75 @@ class VisitorStats(db.Model):
     last_visit = db.Column(db.DateTime, default=datetime.utcnow)
     
     __table_args__ = (db.UniqueConstraint('ip_address', 'visit_date', name='unique_daily_visitor'),)
+
+class VerificationJob(db.Model):
+    """Queued credibility check for a submitted article, processed by `flask verify-worker`"""
+    id = db.Column(db.Integer, primary_key=True)
+    article_id = db.Column(db.Integer, nullable=False, index=True)  # No FK: the job outlives auto-deleted articles
+    status = db.Column(db.String(20), default='queued', nullable=False)  # queued, running, done, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=3, nullable=False)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # Not claimable before this
+    locked_until = db.Column(db.DateTime, nullable=True)  # Visibility timeout while running
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (db.Index('ix_verification_job_status_available', 'status', 'available_at'),)
+
+class OutboxEmail(db.Model):
+    """Outgoing email, queued by request handlers and delivered by the background sender"""
+    __tablename__ = 'outbox_email'
+    id = db.Column(db.Integer, primary_key=True)
+    to_address = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default='queued', nullable=False)  # queued, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=5, nullable=False)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # Not sent before this (backoff)
+    locked_until = db.Column(db.DateTime, nullable=True)  # Claimed by a sender until this time
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (db.Index('ix_outbox_email_status_available', 'status', 'available_at'),)
+
+class DigestEdition(db.Model):
+    """One newsletter digest send; the body is rendered once and progress is checkpointed per chunk"""
+    __tablename__ = 'digest_edition'
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    article_count = db.Column(db.Integer, default=0, nullable=False)
+    status = db.Column(db.String(20), default='sending', nullable=False)  # sending, done
+    last_subscriber_id = db.Column(db.Integer, default=0, nullable=False)  # Subscribers up to this id are done
+    sent_count = db.Column(db.Integer, default=0, nullable=False)
+    deferred_count = db.Column(db.Integer, default=0, nullable=False)  # Handed to the outbox for retry
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+class ImageUpload(db.Model):
+    """Article image spooled to local disk at submit time, pushed to storage by the background uploader"""
+    __tablename__ = 'image_upload'
+    id = db.Column(db.Integer, primary_key=True)
+    article_id = db.Column(db.Integer, nullable=False, index=True)  # No FK: the upload is dropped if the article is gone
+    spool_path = db.Column(db.String(500), nullable=False)
+    spool_host = db.Column(db.String(255), nullable=False)  # Only this host can read the spooled file
+    status = db.Column(db.String(20), default='queued', nullable=False)  # queued, uploading, done, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=5, nullable=False)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (db.Index('ix_image_upload_host_status_available', 'spool_host', 'status', 'available_at'),)
+
+class SchemaVersion(db.Model):
+    """One row per applied step of app/migrations.py, written by `flask db-upgrade`"""
+    __tablename__ = 'schema_version'
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
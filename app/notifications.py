@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from . import db
+from .models import Notification
+from .stats_cache import StatsCache
+
+# Per-user unread counts for the navbar badge, keyed 'unread:<user_id>'
+unread_cache = StatsCache(timeout=60, config_key='NOTIFICATION_UNREAD_CACHE_TIMEOUT')
+
+def _cache_key(user_id):
+    return f'unread:{user_id}'
+
+def unread_count(user_id):
+    """Cached number of unread notifications (served from the partial unread index)"""
+    return unread_cache.get(
+        _cache_key(user_id),
+        lambda: Notification.query.filter_by(user_id=user_id, is_read=False).count()
+    )
+
+def mark_all_read(user_id):
+    """Mark every unread notification of a user as read with one UPDATE; returns the number changed"""
+    updated = Notification.query\
+        .filter(Notification.user_id == user_id, Notification.is_read == False)\
+        .update({Notification.is_read: True}, synchronize_session=False)  # noqa: E712
+    db.session.commit()
+    unread_cache.invalidate(_cache_key(user_id))
+    return updated
+
+def prune_notifications(retention_days=90, batch_size=1000):
+    """
+    Delete read notifications older than retention_days, in batches so a large backlog
+    never holds a long lock. Unread notifications are kept. Returns the number deleted.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = 0
+    while True:
+        ids = [row.id for row in db.session.query(Notification.id)
+               .filter(Notification.is_read == True, Notification.timestamp < cutoff)  # noqa: E712
+               .order_by(Notification.id).limit(batch_size)]
+        if not ids:
+            break
+        deleted += Notification.query.filter(Notification.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+    return deleted
+
+@event.listens_for(Notification, 'after_insert')
+def _notification_created(mapper, connection, target):
+    # New notifications in this process refresh the badge on the next request;
+    # ones written by other processes show up within the cache timeout
+    unread_cache.invalidate(_cache_key(target.user_id))
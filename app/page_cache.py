@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, request, session
+from flask_login import current_user
+from . import db
+
+logger = logging.getLogger(__name__)
+
+VERSION_NAME = 'pages'
+
+class PageCache:
+    """
+    Per-process LRU cache of rendered public pages for anonymous GET requests, keyed by
+    host + path + query string + content version. Admin writes bump the shared version in
+    the content_version table; each process re-reads it every `version_poll` seconds, so
+    edits show up everywhere within that window and stale entries simply stop matching.
+    Per-visitor work (analytics, session flags) runs through each view's `track` hook on
+    hits and misses alike, never inside the cached body.
+    """
+
+    def __init__(self, max_entries=500, ttl=300, version_poll=5.0):
+        self.enabled = True
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_poll = version_poll
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (body, content_type, expires_at)
+        self._version = 0
+        self._version_checked_at = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PAGE_CACHE_ENABLED', self.enabled)
+        self.max_entries = app.config.get('PAGE_CACHE_MAX_ENTRIES', self.max_entries)
+        self.ttl = app.config.get('PAGE_CACHE_TTL', self.ttl)
+        self.version_poll = app.config.get('PAGE_CACHE_VERSION_POLL', self.version_poll)
+
+    def content_version(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._version_checked_at is not None and now - self._version_checked_at < self.version_poll:
+                return self._version
+        from .models import ContentVersion
+        try:
+            version = ContentVersion.current(VERSION_NAME)
+        except Exception as e:
+            logger.warning(f"Could not read page cache content version: {e}")
+            db.session.rollback()
+            version = self._version
+        with self._lock:
+            if version != self._version:
+                # Entries for the old version can never match again
+                self._entries.clear()
+                self._version = version
+            self._version_checked_at = now
+        return version
+
+    def bump(self):
+        """Record a content change; call after the admin's write has been committed"""
+        from .models import ContentVersion
+        ContentVersion.bump(VERSION_NAME)
+        with self._lock:
+            self._entries.clear()
+            self._version_checked_at = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _cacheable_request(self):
+        return (self.enabled and request.method in ('GET', 'HEAD')
+                and '_flashes' not in session
+                and not current_user.is_authenticated)
+
+    def _key(self):
+        query = request.query_string.decode('latin-1')
+        return f'{request.host}|{request.path}|{query}|{self.content_version()}'
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, body, content_type):
+        with self._lock:
+            self._entries[key] = (body, content_type, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def cached(self, track=None):
+        """
+        Serve the decorated view from the cache for anonymous visitors. `track(**view_args)`
+        is called for every successful response, cached or not.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self._cacheable_request():
+                    response = view(*args, **kwargs)
+                    if track is not None and getattr(response, 'status_code', 200) == 200:
+                        track(**kwargs)
+                    return response
+                key = self._key()
+                entry = self.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    response = Response(entry[0], 200, content_type=entry[1])
+                    response.headers['X-Page-Cache'] = 'HIT'
+                else:
+                    self.misses += 1
+                    response = view(*args, **kwargs)
+                    if not isinstance(response, Response):
+                        response = Response(response)
+                    if (response.status_code == 200 and not response.direct_passthrough
+                            and response.mimetype == 'text/html'):
+                        self.set(key, response.get_data(), response.content_type)
+                    response.headers['X-Page-Cache'] = 'MISS'
+                response.vary.add('Cookie')
+                if track is not None and response.status_code == 200:
+                    track(**kwargs)
+                return response
+            return wrapper
+        return decorator
+
+page_cache = PageCache()
@@ -0,0 +1,115 @@
+import base64
+import binascii
+from datetime import datetime
+
+from sqlalchemy import func, tuple_
+from . import db
+
+class KeysetPage:
+    """
+    One page of a cursor-paginated query. Cursors are opaque strings for the `next_cursor`
+    and `prev_cursor` links; every page costs one indexed range scan however deep it is.
+    """
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None, total=None, total_capped=False):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.total_capped = total_capped  # total is a lower bound ("1000+")
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    @property
+    def total_label(self):
+        if self.total is None:
+            return ''
+        return f'{self.total}+' if self.total_capped else str(self.total)
+
+def _encode_value(value):
+    if value is None:
+        return 'n'
+    if isinstance(value, datetime):
+        return 'd' + value.isoformat()
+    if isinstance(value, int):
+        return 'i' + str(value)
+    return 's' + str(value)
+
+def _decode_value(raw):
+    kind, body = raw[:1], raw[1:]
+    if kind == 'n':
+        return None
+    if kind == 'd':
+        return datetime.fromisoformat(body)
+    if kind == 'i':
+        return int(body)
+    if kind == 's':
+        return body
+    raise ValueError(f'Unknown cursor value type {kind!r}')
+
+def encode_cursor(direction, values):
+    raw = direction + '\x1f' + '\x1f'.join(_encode_value(v) for v in values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, key_count):
+    """Return (direction, values), or (None, None) for a missing or malformed cursor"""
+    if not cursor:
+        return None, None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        direction, *values = raw.split('\x1f')
+        values = [_decode_value(v) for v in values]
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None, None
+    if direction not in ('n', 'p') or len(values) != key_count or None in values:
+        return None, None
+    return direction, values
+
+def keyset_paginate(query, keys, cursor=None, per_page=20, descending=True, total=None, total_capped=False):
+    """
+    Paginate `query` on the ordered `keys` (the last key must be unique, e.g. the id).
+    Fetches per_page + 1 rows after (or before) the cursor position instead of using OFFSET.
+    """
+    direction, values = decode_cursor(cursor, len(keys))
+    backward = direction == 'p'
+    row_key = tuple_(*keys) if len(keys) > 1 else keys[0]
+    if values is not None:
+        position = tuple_(*values) if len(keys) > 1 else values[0]
+        # Walking forward on a descending list means "smaller than the cursor"
+        query = query.filter(row_key < position if descending != backward else row_key > position)
+    reverse_scan = descending != backward
+    query = query.order_by(None).order_by(*[k.desc() if reverse_scan else k.asc() for k in keys])
+    rows = query.limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backward:
+        rows.reverse()
+
+    def _cursor(direction, row):
+        return encode_cursor(direction, [getattr(row, k.key) for k in keys])
+
+    has_next = True if backward else more
+    has_prev = more if backward else values is not None
+    return KeysetPage(
+        rows, per_page,
+        next_cursor=_cursor('n', rows[-1]) if rows and has_next else None,
+        prev_cursor=_cursor('p', rows[0]) if rows and has_prev else None,
+        total=total,
+        total_capped=total_capped
+    )
+
+def capped_count(query, cap=1000):
+    """
+    Count matching rows, stopping at `cap`. Returns (count, capped) so large lists show
+    "1000+" instead of paying for a full COUNT(*).
+    """
+    limited = query.order_by(None).with_entities(db.literal_column('1')).limit(cap).subquery()
+    count = db.session.query(func.count()).select_from(limited).scalar()
+    return count, count >= cap
@@ -0,0 +1,108 @@
+import json
+import re
+
+from sqlalchemy import select, func, inspect
+from . import db
+
+def ensure_indexes():
+    """Create any model-declared index missing from an existing database (create_all skips them)"""
+    inspector = inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                created.append(index.name)
+    return created
+
+def hot_queries():
+    """(name, table that must not be fully scanned, statement) for each hot query"""
+    from .models import Article, Analytics, AnalyticsDaily, Notification, Comment, LogEntry
+    return [
+        ('approved articles listing', 'article',
+         select(Article.id).where(Article.status == 'approved').order_by(Article.created_at.desc()).limit(12)),
+        ('category listing', 'article',
+         select(Article.id).where(Article.status == 'approved', Article.category_id == 1)
+         .order_by(Article.created_at.desc())),
+        ('admin pending queue', 'article',
+         select(Article.id).where(Article.status == 'pending').order_by(Article.id.desc()).limit(10)),
+        ('profile articles', 'article',
+         select(Article.id).where(Article.submitted_by == 1).order_by(Article.id.desc())),
+        ('article view count', 'analytics',
+         select(func.count(Analytics.id)).where(Analytics.article_id == 1, Analytics.event_type == 'view')),
+        ('recent views window', 'analytics',
+         select(func.count(Analytics.id)).where(Analytics.event_type == 'view',
+                                                Analytics.timestamp >= '2024-01-01 00:00:00')),
+        ('dashboard views window', 'analytics_daily',
+         select(func.sum(AnalyticsDaily.count)).where(AnalyticsDaily.event_type == 'view',
+                                                      AnalyticsDaily.day >= '2024-01-01')),
+        ('article rolled-up views', 'analytics_daily',
+         select(func.sum(AnalyticsDaily.count)).where(AnalyticsDaily.article_id == 1,
+                                                      AnalyticsDaily.event_type == 'view')),
+        ('notification inbox', 'notification',
+         select(Notification.id).where(Notification.user_id == 1).order_by(Notification.id.desc()).limit(20)),
+        ('unread notification count', 'notification',
+         select(func.count(Notification.id)).where(Notification.user_id == 1, Notification.is_read == False)),  # noqa: E712
+        ('article comments', 'comment',
+         select(Comment.id).where(Comment.article_id == 1).order_by(Comment.created_at.desc())),
+        ('admin console log', 'log_entry',
+         select(LogEntry.id).order_by(LogEntry.id.desc()).limit(10)),
+    ]
+
+def _rowid_limit(sql, table):
+    """True for ORDER BY <integer primary key> ... LIMIT: SQLite walks the rowid b-tree and stops early"""
+    pk = [col.name for col in db.metadata.tables[table].primary_key.columns]
+    return len(pk) == 1 and re.search(rf'ORDER BY "?{table}"?\.{pk[0]}( ASC| DESC)?\s+LIMIT\b', sql) is not None
+
+def _sqlite_full_scans(conn, sql, table):
+    rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql).fetchall()
+    plan = [row[-1] for row in rows]
+    # "SCAN article" is a full scan; "SCAN article USING INDEX ..." and "SEARCH ..." are not
+    scans = [line for line in plan if re.match(rf'SCAN (TABLE )?{table}\b(?!.*USING)', line)]
+    if scans and _rowid_limit(sql, table) and not any('TEMP B-TREE' in line for line in plan):
+        scans = []  # Reads LIMIT rows from one end of the table, not the whole table
+    return plan, scans
+
+def _postgres_full_scans(conn, sql, table):
+    # Disable sequential scans so tiny test tables still reveal whether an index is usable
+    conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    raw = conn.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + sql).scalar()
+    data = raw if isinstance(raw, list) else json.loads(raw)
+    plan, scans = [], []
+
+    def walk(node, depth=0):
+        line = '  ' * depth + node['Node Type'] + (f" on {node['Relation Name']}" if 'Relation Name' in node else '')
+        if 'Index Name' in node:
+            line += f" using {node['Index Name']}"
+        plan.append(line)
+        if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == table:
+            scans.append(line.strip())
+        for child in node.get('Plans', []):
+            walk(child, depth + 1)
+
+    walk(data[0]['Plan'])
+    return plan, scans
+
+def check_query_plans():
+    """
+    EXPLAIN every hot query and return [(name, plan_lines, full_scan_lines)].
+    A non-empty full_scan_lines means the query regressed to a full table scan.
+    """
+    dialect = db.engine.dialect
+    results = []
+    for name, table, stmt in hot_queries():
+        sql = str(stmt.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+        with db.engine.connect() as conn:
+            with conn.begin() as trans:
+                if dialect.name == 'sqlite':
+                    plan, scans = _sqlite_full_scans(conn, sql, table)
+                elif dialect.name == 'postgresql':
+                    plan, scans = _postgres_full_scans(conn, sql, table)
+                else:
+                    raise RuntimeError(f'Query plan checks are not supported on {dialect.name}')
+                trans.rollback()
+        results.append((name, plan, scans))
+    return results
@@ -2,8 +2,15 @@ from flask import Blueprint, render_template, redirect, url_for, request, flash
 from flask_login import login_required, current_user
 from ..models import Article, User, LogEntry, Notification, Analytics, Comment, Newsletter, Category, TickerMessage
 from .. import db
+from ..stats_cache import stats_cache
+from ..identity import identity_cache
+from ..analytics_rollup import rolled_up_total, top_articles, views_by_category, last_aggregated_at
+from ..search import match_filter, index_article, remove_article
+from ..pagination import keyset_paginate, capped_count
 from werkzeug.security import generate_password_hash
 from .auth import send_email  # import email helper
+from .articles import invalidate_rss_cache
+from ..page_cache import page_cache
  # Removed file logging; logs will be stored in DB and shown in admin panel
 
 bp = Blueprint('admin', __name__)
@@ -19,47 +26,46 @@ def admin_panel():
         db.session.commit()
     if current_user.role != 'admin':
         return redirect(url_for('articles.home'))
-    # Search and paginate pending articles
+    # Search and paginate pending articles (keyset cursors: deep pages cost the same as page 1)
     article_search = request.args.get('article_search', '')
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     per_page = 10
     pending_query = Article.query.filter_by(status='pending')
     if article_search:
-        pending_query = pending_query.filter(
-            (Article.title.ilike(f"%{article_search}%")) |
-            (Article.content.ilike(f"%{article_search}%"))
-        )
-    pending_query = pending_query.order_by(Article.id.desc())
-    pag = pending_query.paginate(page=page, per_page=per_page, error_out=False)
+        pending_query = pending_query.filter(match_filter(article_search))
+    pending_total, pending_capped = capped_count(pending_query)
+    pag = keyset_paginate(pending_query, [Article.id], cursor, per_page,
+                          total=pending_total, total_capped=pending_capped)
     pending = pag.items
     # Search registered users
     user_search = request.args.get('user_search', '')
-    user_page = request.args.get('user_page', 1, type=int)
+    user_cursor = request.args.get('user_cursor')
     users_query = User.query
     if user_search:
         users_query = users_query.filter(
             (User.username.ilike(f"%{user_search}%")) |
             (User.role.ilike(f"%{user_search}%"))
         )
-    users_pag = users_query.order_by(User.id).paginate(page=user_page, per_page=per_page, error_out=False)
+    users_pag = keyset_paginate(users_query, [User.id], user_cursor, per_page, descending=False)
     users = users_pag.items
     # Search in all articles
     all_search = request.args.get('all_search', '')
-    all_page = request.args.get('all_page', 1, type=int)
+    all_cursor = request.args.get('all_cursor')
     all_articles_query = Article.query
     if all_search:
         all_articles_query = all_articles_query.filter(
             Article.title.ilike(f"%{all_search}%")
         )
-    all_pag = all_articles_query.order_by(Article.id.desc()).paginate(page=all_page, per_page=per_page, error_out=False)
+    all_pag = keyset_paginate(all_articles_query, [Article.id], all_cursor, per_page)
     all_articles = all_pag.items
     # Paginate logs with optional filtering
     log_search = request.args.get('log_search', '')
-    log_page = request.args.get('log_page', 1, type=int)
+    log_cursor = request.args.get('log_cursor')
     logs_query = LogEntry.query
     if log_search:
         logs_query = logs_query.filter(LogEntry.action.ilike(f"%{log_search}%"))
-    logs_pag = logs_query.order_by(LogEntry.timestamp.desc()).paginate(page=log_page, per_page=per_page, error_out=False)
+    # Newest first by id: older rows only have whole-second timestamps
+    logs_pag = keyset_paginate(logs_query, [LogEntry.id], log_cursor, per_page)
     logs = logs_pag.items
     return render_template(
         'admin_panel.html',
@@ -68,16 +74,13 @@ def admin_panel():
         users=users,
         user_search=user_search,
         users_pag=users_pag,
-        user_page=user_page,
         all_articles=all_articles,
         all_search=all_search,
         all_pag=all_pag,
-        all_page=all_page,
         logs=logs,
         pag=pag,
         log_search=log_search,
-        logs_pag=logs_pag,
-        log_page=log_page
+        logs_pag=logs_pag
     )
 
 @bp.route('/admin/approve/<string:hash_id>')
@@ -87,6 +90,7 @@ def approve_article(hash_id):
         return redirect(url_for('articles.home'))
     article = Article.query.filter_by(hash_id=hash_id).first_or_404()
     reason = request.args.get('reason', '')
+    was_approved = article.status == 'approved'
     article.status = 'approved'
 
     # Add article title to ticker
@@ -94,6 +98,10 @@ def approve_article(hash_id):
     db.session.add(ticker_message)
 
     db.session.commit()
+    if not was_approved:
+        stats_cache.incr('total_articles')
+    invalidate_rss_cache()
+    page_cache.bump()
     # Log and notify
     entry = LogEntry(article_id=article.id, action=f"Approved by admin '{current_user.username}'")
     db.session.add(entry)
@@ -116,6 +124,7 @@ def manage_ticker():
             new_message = TickerMessage(message=message)
             db.session.add(new_message)
             db.session.commit()
+            page_cache.bump()
             flash('Ticker message added successfully.', 'success')
         return redirect(url_for('admin.manage_ticker'))
 
@@ -131,6 +140,7 @@ def delete_ticker_message(id):
     message = TickerMessage.query.get_or_404(id)
     db.session.delete(message)
     db.session.commit()
+    page_cache.bump()
     flash('Ticker message deleted successfully.', 'success')
     return redirect(url_for('admin.manage_ticker'))
 
@@ -141,8 +151,14 @@ def reject_article(hash_id):
         return redirect(url_for('articles.home'))
     article = Article.query.filter_by(hash_id=hash_id).first_or_404()
     reason = request.args.get('reason', '')
+    was_approved = article.status == 'approved'
     article.status = 'rejected'
     db.session.commit()
+    # Pending article pages are cached too
+    page_cache.bump()
+    if was_approved:
+        stats_cache.incr('total_articles', -1)
+        invalidate_rss_cache()
     # Log and notify
     entry = LogEntry(article_id=article.id, action=f"Rejected by admin '{current_user.username}'")
     db.session.add(entry)
@@ -163,6 +179,7 @@ def delete_article(hash_id):
     # Store article info for logging before deletion
     article_title = article.title
     article_id = article.id
+    was_approved = article.status == 'approved'
     
     # Log the deletion before deleting the article
     entry = LogEntry(article_id=article_id, action=f"Deleted by admin '{current_user.username}'")
@@ -170,8 +187,13 @@ def delete_article(hash_id):
     db.session.commit()
     
     # Now delete the article (this will cascade delete all related records)
+    remove_article(article_id)
     db.session.delete(article)
     db.session.commit()
+    page_cache.bump()
+    if was_approved:
+        stats_cache.incr('total_articles', -1)
+        invalidate_rss_cache()
     
     flash(f'Article "{article_title}" deleted successfully.', 'warning')
     return redirect(url_for('admin.admin_panel'))
@@ -185,7 +207,10 @@ def edit_article(hash_id):
     if request.method == 'POST':
         article.title = request.form['title']
         article.content = request.form['content']
+        index_article(article)
         db.session.commit()
+        invalidate_rss_cache()
+        page_cache.bump()
         # Record log
         entry = LogEntry(article_id=article.id, action=f"Edited by admin '{current_user.username}'")
         db.session.add(entry)
@@ -204,6 +229,9 @@ def delete_user(id):
     if user.id != current_user.id and user.role != 'admin':
         db.session.delete(user)
         db.session.commit()
+        identity_cache.invalidate(user.id)
+        stats_cache.incr('total_users', -1)
+        page_cache.bump()  # Public pages may show them as an author
         # Record log for user deletion
         entry = LogEntry(action=f"Deleted user '{user.username}' by admin '{current_user.username}'")
         db.session.add(entry)
@@ -233,6 +261,7 @@ def promote_user(id):
     user.role = 'admin'
     user.is_super_admin = False  # Only CLI/startup can create super admins
     db.session.commit()
+    identity_cache.invalidate(user.id)
     
     # Record promotion log
     entry = LogEntry(action=f"Promoted user '{user.username}' to admin by super admin '{current_user.username}'")
@@ -279,6 +308,7 @@ def demote_user(id):
     user.role = 'user'
     user.is_super_admin = False
     db.session.commit()
+    identity_cache.invalidate(user.id)
     
     # Record demotion log
     entry = LogEntry(action=f"Demoted admin '{user.username}' to user by super admin '{current_user.username}'")
@@ -330,6 +360,7 @@ def reset_password(id):
     
     user.password = generate_password_hash(temp_pw)
     db.session.commit()
+    identity_cache.invalidate(user.id)
     
     # Record password reset log
     entry = LogEntry(action=f"Reset password for '{user.username}' by '{current_user.username}' ({current_user.role})")
@@ -361,37 +392,29 @@ def analytics_dashboard():
     if current_user.role != 'admin':
         return redirect(url_for('articles.home'))
     
-    # Get analytics data
+    # Get analytics data (event counts come from the rollup tables, kept current by `flask aggregate-analytics`)
     total_articles = Article.query.count()
     total_users = User.query.count()
-    total_views = Analytics.query.filter_by(event_type='view').count()
+    total_views = rolled_up_total('view')
     total_comments = Comment.query.count()
     newsletter_subscribers = Newsletter.query.filter_by(is_active=True).count()
     
     # Most viewed articles
-    from sqlalchemy import func
-    most_viewed = db.session.query(
-        Article.id, Article.title, func.count(Analytics.id).label('views')
-    ).join(Analytics, Article.id == Analytics.article_id)\
-    .filter(Analytics.event_type == 'view')\
-    .group_by(Article.id, Article.title)\
-    .order_by(func.count(Analytics.id).desc())\
-    .limit(10).all()
+    most_viewed = top_articles('view', limit=10)
     
     # Recent activity (last 30 days)
     from datetime import datetime, timedelta
-    thirty_days_ago = datetime.now() - timedelta(days=30)
-    recent_views = Analytics.query.filter(
-        Analytics.event_type == 'view',
-        Analytics.timestamp >= thirty_days_ago
-    ).count()
+    thirty_days_ago = (datetime.utcnow() - timedelta(days=30)).date()
+    recent_views = rolled_up_total('view', since=thirty_days_ago)
     
     # Category breakdown
+    from sqlalchemy import func
     category_stats = db.session.query(
         Category.name, func.count(Article.id).label('article_count')
     ).join(Article, Category.id == Article.category_id)\
     .filter(Article.status == 'approved')\
     .group_by(Category.name).all()
+    category_views = views_by_category('view')
     
     return render_template('analytics_dashboard.html',
                          total_articles=total_articles,
@@ -401,4 +424,6 @@ def analytics_dashboard():
                          newsletter_subscribers=newsletter_subscribers,
                          most_viewed=most_viewed,
                          recent_views=recent_views,
-                         category_stats=category_stats)
+                         category_stats=category_stats,
+                         category_views=category_views,
+                         aggregated_at=last_aggregated_at())
@@ -1,120 +1,53 @@
-from flask import Blueprint, render_template, request, redirect, flash, current_app, url_for, Response, session
+from flask import Blueprint, render_template, request, redirect, flash, current_app, url_for, Response, session, jsonify
 import logging
+import hashlib
 import threading
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
 from xml.sax.saxutils import escape
 import os
-import cloudinary
-import cloudinary.uploader
-from werkzeug.utils import secure_filename
-import markdown
-import bleach
-from markdown.extensions import codehilite, tables, fenced_code
 
 from flask_login import login_required, current_user
+from sqlalchemy.orm import load_only
 from .. import db
-from ..models import Article, LogEntry, Notification, User, Category, Comment, Newsletter, Analytics, TickerMessage
-from ..scraper import verify_article
+from ..models import Article, LogEntry, Notification, User, Category, Comment, Newsletter, TickerMessage
+from ..jobs import enqueue_verification
+from ..analytics_buffer import record_event
+from ..stats_cache import stats_cache
+from ..pagination import keyset_paginate, capped_count
+from ..notifications import mark_all_read, unread_count
+from ..analytics_rollup import event_total
+from ..search import index_article, search_articles
+from ..content import process_article_content, create_excerpt
+from ..uploads import spool_upload, uploader
+from ..page_cache import page_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
-# Configure Cloudinary (for image uploads)
-cloudinary.config(
-    cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
-    api_key=os.getenv('CLOUDINARY_API_KEY'),
-    api_secret=os.getenv('CLOUDINARY_API_SECRET')
-)
-
 bp = Blueprint('articles', __name__)
 
-def process_article_content(content):
-    """Process article content to support both Markdown and HTML safely"""
-    try:
-        # Configure allowed HTML tags and attributes
-        allowed_tags = [
-            'p', 'br', 'strong', 'b', 'em', 'i', 'u', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-            'ul', 'ol', 'li', 'blockquote', 'a', 'img', 'code', 'pre', 'span', 'div',
-            'table', 'thead', 'tbody', 'tr', 'th', 'td'
-        ]
-        
-        allowed_attributes = {
-            'a': ['href', 'title', 'target'],
-            'img': ['src', 'alt', 'title', 'width', 'height'],
-            'span': ['class'],
-            'div': ['class'],
-            'table': ['class'],
-            'th': ['class'],
-            'td': ['class']
-        }
-        
-        # First, convert Markdown to HTML
-        md = markdown.Markdown(extensions=[
-            'fenced_code',
-            'tables',
-            'nl2br',
-            'codehilite'
-        ])
-        html_content = md.convert(content)
-        
-        # Then sanitize the HTML to prevent XSS
-        clean_content = bleach.clean(
-            html_content, 
-            tags=allowed_tags, 
-            attributes=allowed_attributes,
-            strip=True
-        )
-        
-        return clean_content
-        
-    except Exception as e:
-        # Fallback to simple HTML escaping if markdown processing fails
-        logging.warning(f"Markdown processing failed: {e}")
-        return bleach.clean(content, tags=['p', 'br', 'strong', 'em'], strip=True)
-
-def create_excerpt(html_content, max_length=200):
-    """Create a plain text excerpt from HTML content"""
-    try:
-        # Remove HTML tags to get plain text
-        text = bleach.clean(html_content, tags=[], strip=True)
-        # Clean up extra whitespace
-        text = ' '.join(text.split())
-        # Truncate if needed
-        if len(text) > max_length:
-            text = text[:max_length].rsplit(' ', 1)[0] + '...'
-        return text
-    except Exception:
-        return html_content[:max_length] + '...' if len(html_content) > max_length else html_content
+def _track_home():
+    # Track unique homepage visits
+    if 'visited_homepage' not in session:
+        # This is a new visit
+        record_event('homepage_view')
+        session['visited_homepage'] = True
 
 @bp.route('/')
+@page_cache.cached(track=_track_home)
 def home():
     # Get articles with categories for better display
     articles = Article.query.filter_by(status='approved').order_by(Article.created_at.desc()).limit(10).all()
     categories = Category.query.all()
     ticker_messages = TickerMessage.query.order_by(TickerMessage.created_at.desc()).all()
     
-    # Get featured article (most viewed)
-    featured_article = None
-    if articles:
-        # Get article with most views
-        view_counts = {}
-        for article in articles:
-            view_count = Analytics.query.filter_by(article_id=article.id, event_type='view').count()
-            view_counts[article.id] = view_count
-        
-        if view_counts:
-            featured_article_id = max(view_counts, key=view_counts.get)
-            featured_article = Article.query.get(featured_article_id)
-
-    # Track unique homepage visits
-    if 'visited_homepage' not in session:
-        # This is a new visit
-        new_visit = Analytics(event_type='homepage_view')
-        db.session.add(new_visit)
-        db.session.commit()
-        session['visited_homepage'] = True
+    # Get featured article (most viewed of the latest), using the denormalized view counter
+    featured_article = max(articles, key=lambda a: a.views or 0) if articles else None
 
     # Get total unique homepage visits
-    total_visits = Analytics.query.filter_by(event_type='homepage_view').count()
+    total_visits = event_total('homepage_view')
 
     return render_template(
         'home.html', 
@@ -133,23 +66,19 @@ def submit_article():
         raw_content = request.form['content']
         category_id = request.form.get('category_id') or None
         tags = request.form.get('tags', '').strip()
-        image_url = None
+        spool_path = None
         
         # Process content to support Markdown and HTML
         processed_content = process_article_content(raw_content)
         
-        # Handle image upload
+        # Spool the image to local disk; the background uploader pushes it and sets image_url
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename:
                 try:
-                    # Upload to Cloudinary
-                    upload_result = cloudinary.uploader.upload(
-                        file,
-                        folder="youth_times/articles",
-                        transformation=[{'width': 800, 'height': 600, 'crop': 'limit'}]
-                    )
-                    image_url = upload_result['secure_url']
+                    spool_path = spool_upload(file, current_app.config['UPLOAD_SPOOL_DIR'])
+                    if not spool_path:
+                        flash('Image skipped: please upload a JPG, PNG, GIF, WebP or AVIF file.', 'warning')
                 except Exception as e:
                     flash(f'Image upload failed: {str(e)}', 'warning')
         
@@ -162,56 +91,28 @@ def submit_article():
             submitted_by=current_user.id,
             category_id=category_id,
             tags=tags,
-            image_url=image_url
+            image_url=None
         )
         db.session.add(article)
+        db.session.flush()
+        index_article(article)
+        # Queue the authenticity check; `flask verify-worker` scores it and applies the threshold
+        enqueue_verification(article.id)
+        if spool_path:
+            uploader.queue(article.id, spool_path)
         db.session.commit()
+        if spool_path:
+            uploader.wake()
         
-        # Track analytics
-        analytics = Analytics(
+        # Track analytics (buffered)
+        record_event(
+            'submit',
             article_id=article.id,
-            event_type='submit',
             user_id=current_user.id,
             ip_address=request.remote_addr
         )
-        db.session.add(analytics)
-        db.session.commit()
         
         flash("Article submitted successfully. Authenticity check is running in the background.")
-        # Background thread to verify trust score and apply threshold
-        # Capture the Flask app for use in the thread
-        app_ctx = current_app._get_current_object()
-        def _background_verify(article_id, app):
-            with app.app_context():
-                art = Article.query.get(article_id)
-                if not art:
-                    return
-                score = verify_article(art.title, art.content)
-                if score < 50:
-                    # Auto-delete low-trust articles
-                    db.session.delete(art)
-                    db.session.commit()
-                    # Log deletion action and notify user
-                    entry = LogEntry(article_id=article_id, action=f"Auto-deleted (trust {score}%)")
-                    db.session.add(entry)
-                    db.session.commit()
-                    notif = Notification(user_id=art.submitted_by, article_id=article_id,
-                                           message=f"Your article '{art.title}' was automatically deleted (trust {score}%).")
-                    db.session.add(notif)
-                    db.session.commit()
-                    logging.info(f"Article ID {article_id} automatically discarded (trust {score}%).")
-                else:
-                    art.trust_score = score
-                    db.session.commit()
-                    # Log pending action and notify user
-                    entry = LogEntry(article_id=article_id, action=f"Marked pending (trust {score}%)")
-                    db.session.add(entry)
-                    notif = Notification(user_id=art.submitted_by, article_id=article_id,
-                                           message=f"Your article '{art.title}' passed authenticity check (trust {score}%) and is pending approval.")
-                    db.session.add(notif)
-                    db.session.commit()
-                    logging.info(f"Article ID {article_id} marked pending with trust {score}%.")
-        threading.Thread(target=_background_verify, args=(article.id, app_ctx), daemon=True).start()
         flash("Article submitted. Authenticity check running in background. You can view your submission below.")
         return redirect(url_for('articles.view_article', id=article.id))
     
@@ -219,22 +120,22 @@ def submit_article():
     categories = Category.query.all()
     return render_template('submit_article.html', categories=categories)
 
-@bp.route('/article/<int:id>')
-def view_article(id):
-    article = Article.query.get_or_404(id)
-    
-    # Track page view
-    analytics = Analytics(
-        article_id=article.id,
-        event_type='view',
+def _track_article_view(id):
+    # Track page view (buffered; the flush also bumps Article.views)
+    record_event(
+        'view',
+        article_id=id,
         user_id=current_user.id if current_user.is_authenticated else None,
         ip_address=request.remote_addr
     )
-    db.session.add(analytics)
-    db.session.commit()
+
+@bp.route('/article/<int:id>')
+@page_cache.cached(track=_track_article_view)
+def view_article(id):
+    article = Article.query.get_or_404(id)
     
-    # Get approved comments
-    comments = Comment.query.filter_by(article_id=id, is_approved=True).order_by(Comment.created_at.desc()).all()
+    # Comments removed by an admin stay in the table with is_deleted set
+    comments = Comment.query.filter_by(article_id=id, is_deleted=False).order_by(Comment.created_at.desc()).all()
     
     return render_template('article_detail.html', article=article, comments=comments)
 
@@ -251,23 +152,21 @@ def add_comment(id):
     comment = Comment(
         content=content,
         article_id=id,
-        user_id=current_user.id,
-        is_approved=False  # Comments need approval
+        user_id=current_user.id
     )
     db.session.add(comment)
     db.session.commit()
+    page_cache.bump()  # Cached copies of the article were rendered without it
     
     # Track comment analytics
-    analytics = Analytics(
+    record_event(
+        'comment',
         article_id=id,
-        event_type='comment',
         user_id=current_user.id,
         ip_address=request.remote_addr
     )
-    db.session.add(analytics)
-    db.session.commit()
     
-    flash('Comment submitted for approval.', 'success')
+    flash('Comment posted.', 'success')
     return redirect(url_for('articles.view_article', id=id))
 
 @bp.route('/newsletter/subscribe', methods=['POST'])
@@ -300,14 +199,12 @@ def share_article(id, platform):
     article = Article.query.get_or_404(id)
     
     # Track share analytics
-    analytics = Analytics(
+    record_event(
+        f'share_{platform}',
         article_id=id,
-        event_type=f'share_{platform}',
         user_id=current_user.id if current_user.is_authenticated else None,
         ip_address=request.remote_addr
     )
-    db.session.add(analytics)
-    db.session.commit()
     
     article_url = url_for('articles.view_article', id=id, _external=True)
     
@@ -323,82 +220,142 @@ def share_article(id, platform):
     
     return redirect(url_for('articles.view_article', id=id))
 
+# Rendered feed per site root: {'etag', 'last_modified', 'body', 'expires'}
+_rss_cache = {}
+_rss_cache_lock = threading.Lock()
+
+def invalidate_rss_cache():
+    """Drop the cached feed (call when an article is approved, edited or deleted)"""
+    with _rss_cache_lock:
+        _rss_cache.clear()
+
+def _rss_chunks(items, root):
+    """Yield the pieces of the feed XML"""
+    yield "<?xml version='1.0' encoding='UTF-8'?>\n<rss version='2.0'>\n  <channel>\n"
+    yield f"    <title>Youth Times RSS</title>\n    <link>{escape(root)}</link>\n"
+    yield "    <description>Latest approved articles</description>\n"
+    for link, title, excerpt, pub_date in items:
+        yield (f"    <item>\n      <title>{escape(title)}</title>\n      <link>{escape(link)}</link>\n"
+               f"      <guid>{escape(link)}</guid>\n      <description>{escape(excerpt)}</description>\n")
+        if pub_date:
+            yield f"      <pubDate>{format_datetime(pub_date.replace(tzinfo=timezone.utc))}</pubDate>\n"
+        yield "    </item>\n"
+    yield "  </channel>\n</rss>\n"
+
+def _rss_response(feed):
+    response = Response(feed['body'], mimetype='application/rss+xml')
+    response.set_etag(feed['etag'])
+    response.last_modified = feed['last_modified']
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get('RSS_CACHE_TIMEOUT', 300)
+    return response.make_conditional(request)
+
 @bp.route('/rss')
 def rss_feed():
     """
-    Generate an RSS feed of latest approved articles.
+    Generate an RSS feed of the latest approved articles (excerpts only).
+    The rendered feed is cached and served with ETag/Last-Modified so pollers get 304s.
     """
-    articles = Article.query.filter_by(status='approved').order_by(Article.id.desc()).all()
-    items = ''
-    for art in articles:
-        link = request.url_root.rstrip('/') + url_for('articles.view_article', id=art.id)
-        items += f"""
-        <item>
-            <title>{escape(art.title)}</title>
-            <link>{link}</link>
-            <description>{escape(art.content)}</description>
-        </item>
-        """
-    rss = f"""<?xml version='1.0' encoding='UTF-8'?>
-    <rss version='2.0'>
-      <channel>
-        <title>Youth Times RSS</title>
-        <link>{request.url_root}</link>
-        <description>Latest approved articles</description>
-        {items}
-      </channel>
-    </rss>"""
-    return Response(rss, mimetype='application/rss+xml')
+    root = request.url_root
+    with _rss_cache_lock:
+        cached = _rss_cache.get(root)
+    if cached and cached['expires'] > time.monotonic():
+        return _rss_response(cached)
+
+    limit = current_app.config.get('RSS_FEED_ITEMS', 20)
+    articles = Article.query.filter_by(status='approved')\
+        .options(load_only(Article.id, Article.title, Article.excerpt, Article.created_at))\
+        .order_by(Article.id.desc()).limit(limit).all()
+    items = [
+        (root.rstrip('/') + url_for('articles.view_article', id=art.id), art.title,
+         art.excerpt or create_excerpt(art.content, 300), art.created_at)
+        for art in articles
+    ]
+    dates = [item[3] for item in items if item[3]]
+    # A few KB for RSS_FEED_ITEMS excerpts: render it whole, so the cached bytes, the
+    # Content-Length and Range/304 handling in make_conditional all use the same body
+    feed = {
+        'etag': hashlib.sha1(repr(items).encode('utf-8')).hexdigest(),
+        'last_modified': max(dates).replace(tzinfo=timezone.utc) if dates else datetime.now(timezone.utc),
+        'body': ''.join(_rss_chunks(items, root)).encode('utf-8'),
+        'expires': time.monotonic() + current_app.config.get('RSS_CACHE_TIMEOUT', 300),
+    }
+    with _rss_cache_lock:
+        _rss_cache[root] = feed
+    return _rss_response(feed)
+
 # Route to view user notifications
 @bp.route('/notifications')
 @login_required
 def notifications():
-    notes = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.timestamp.desc()).all()
-    # Mark all as read
-    for n in notes:
-        n.is_read = True
-    db.session.commit()
-    return render_template('notifications.html', notifications=notes)
+    notes_query = Notification.query.filter_by(user_id=current_user.id)
+    total, capped = capped_count(notes_query)
+    # Newest first by id: older rows only have whole-second timestamps
+    pagination = keyset_paginate(notes_query, [Notification.id], request.args.get('cursor'),
+                                 per_page=20, total=total, total_capped=capped)
+    notes = pagination.items
+    # Remember what was new on this page, then mark everything read in one UPDATE
+    unread_ids = {n.id for n in notes if not n.is_read}
+    mark_all_read(current_user.id)
+    return render_template('notifications.html', notifications=notes, pagination=pagination, unread_ids=unread_ids)
+
+@bp.route('/notifications/mark-read', methods=['POST'])
+@login_required
+def mark_notifications_read():
+    updated = mark_all_read(current_user.id)
+    return jsonify({'success': True, 'updated': updated})
+
+@bp.route('/api/notifications/unread-count')
+@login_required
+def unread_notifications_count():
+    response = jsonify({'unread': unread_count(current_user.id)})
+    response.cache_control.private = True
+    response.cache_control.no_store = True
+    return response
 @bp.route('/search')
 def search():
-    q = request.args.get('q', '')
-    results = []
+    q = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    results = None
     if q:
-        results = Article.query.filter(Article.status=='approved')
-        results = results.filter(
-            (Article.title.ilike(f"%{q}%")) | (Article.content.ilike(f"%{q}%"))
-        ).all()
+        results = search_articles(q, status='approved', page=page, per_page=12)
     return render_template('search_results.html', query=q, results=results)
 
 @bp.route('/category/<int:category_id>')
+@page_cache.cached()
 def category_articles(category_id):
     category = Category.query.get_or_404(category_id)
     articles = Article.query.filter_by(status='approved', category_id=category_id).order_by(Article.created_at.desc()).all()
     return render_template('category_articles.html', articles=articles, category=category)
 
+def _track_articles_list():
+    # Track page visit for analytics
+    record_event(
+        'articles_page_view',
+        user_id=current_user.id if current_user.is_authenticated else None,
+        ip_address=request.remote_addr
+    )
+
 @bp.route('/articles')
+@page_cache.cached(track=_track_articles_list)
 def articles_list():
     """Articles listing page with all published articles"""
     try:
-        # Get all approved articles with pagination
-        page = request.args.get('page', 1, type=int)
+        # Get approved articles, newest first, one cursor page at a time
         per_page = 12  # Show 12 articles per page
         
-        articles = Article.query.filter_by(status='approved').order_by(Article.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        # The total is the cached footer count, so listing pages never run COUNT(*)
+        total = stats_cache.get('total_articles', lambda: Article.query.filter_by(status='approved').count())
+        articles = keyset_paginate(
+            Article.query.filter_by(status='approved'),
+            [Article.created_at, Article.id],
+            request.args.get('cursor'),
+            per_page,
+            total=total
         )
         
         categories = Category.query.all()
         
-        # Track page visit for analytics
-        analytics = Analytics(
-            event_type='articles_page_view',
-            user_id=current_user.id if current_user.is_authenticated else None,
-            ip_address=request.remote_addr
-        )
-        db.session.add(analytics)
-        db.session.commit()
-        
         return render_template('articles.html', 
                              articles=articles.items,
                              pagination=articles,
@@ -409,6 +366,7 @@ def articles_list():
         return redirect(url_for('articles.home'))
 
 @bp.route('/about')
+@page_cache.cached()
 def about_us():
     """About Us page showing team members, college, and internship information"""
     try:
@@ -499,21 +457,32 @@ def about_us():
         return redirect(url_for('articles.home'))
 
 @bp.route('/editorial-guidelines')
+@page_cache.cached()
 def editorial_guidelines():
     return render_template('editorial_guidelines.html')
 
 @bp.route('/contact')
+@page_cache.cached()
 def contact():
     return render_template('contact.html')
 
 @bp.route('/terms-of-service')
+@page_cache.cached()
 def terms_of_service():
     return render_template('terms_of_service.html')
 
 @bp.route('/privacy-policy')
+@page_cache.cached()
 def privacy_policy():
     return render_template('privacy_policy.html')
 
 @bp.route('/dmca-policy')
+@page_cache.cached()
 def dmca_policy():
     return render_template('dmca_policy.html')
+
+@bp.route('/offline')
+@page_cache.cached()
+def offline():
+    """Fallback page precached by the service worker"""
+    return render_template('offline.html')
@@ -3,11 +3,13 @@ from sqlalchemy.exc import IntegrityError
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import login_user, logout_user, login_required, current_user
 from .. import db, login_manager, oauth  # import oauth
+from ..stats_cache import stats_cache
+from ..identity import identity_cache
+from ..page_cache import page_cache
+from ..mailer import email_configured, queue_email
 from ..models import User, Article
 import logging
 import os
-import smtplib
-from email.mime.text import MIMEText
 import itsdangerous
 from itsdangerous import URLSafeTimedSerializer
 from flask import current_app, abort
@@ -16,34 +18,17 @@ bp = Blueprint('auth', __name__)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Cached identity snapshot; the full User row is only loaded if a view needs it
+    return identity_cache.load(int(user_id))
 
 def send_email(to_address, subject, body):
-    """Send email with proper error handling"""
-    try:
-        smtp_server = os.getenv('SMTP_SERVER')
-        smtp_port = os.getenv('SMTP_PORT')
-        smtp_user = os.getenv('SMTP_USERNAME')
-        smtp_pass = os.getenv('SMTP_PASSWORD')
-        from_address = os.getenv('EMAIL_SENDER')
-        
-        if not all([smtp_server, smtp_port, smtp_user, smtp_pass, from_address]):
-            print("Email configuration missing. Email not sent.")
-            return False
-            
-        msg = MIMEText(body)
-        msg['Subject'] = subject
-        msg['From'] = from_address
-        msg['To'] = to_address
-        
-        with smtplib.SMTP(smtp_server, int(smtp_port)) as server:
-            server.starttls()
-            server.login(smtp_user, smtp_pass)
-            server.send_message(msg)
-        return True
-    except Exception as e:
-        print(f"Failed to send email: {e}")
+    """Queue an email for the background sender (`flask email-worker`); False if email is not configured"""
+    if not email_configured():
+        print("Email configuration missing. Email not sent.")
         return False
+    queue_email(to_address, subject, body)
+    db.session.commit()
+    return True
 
 # Helpers for email confirmation
 def generate_confirmation_token(email):
@@ -94,9 +79,10 @@ def register():
         try:
             db.session.add(user)
             db.session.commit()
+            stats_cache.incr('total_users')
             
             # Check if email is configured
-            if os.getenv('SMTP_USERNAME') and os.getenv('SMTP_PASSWORD'):
+            if email_configured():
                 # Send confirmation email
                 token = generate_confirmation_token(user.email)
                 confirm_url = url_for('auth.confirm_email', token=token, _external=True)
@@ -205,6 +191,7 @@ def google_callback():
             )
             db.session.add(user)
             db.session.commit()
+            stats_cache.incr('total_users')
             flash('Account created successfully with Google!', 'success')
         else:
             # Update user info from Google
@@ -299,6 +286,7 @@ def profile():
         # For now, we'll use the profile_image URL field
         
         db.session.commit()
+        page_cache.bump()  # Public pages show the author's name and picture
         flash('Profile updated successfully.', 'success')
         return redirect(url_for('auth.profile'))
     # GET or no profile update, show profile
@@ -370,7 +358,7 @@ def test_email():
         flash('Access denied.', 'danger')
         return redirect(url_for('auth.login'))
     
-    test_email_addr = os.getenv('SMTP_USERNAME')
+    test_email_addr = os.getenv('SMTP_USERNAME') or os.getenv('EMAIL_SENDER')
     if not test_email_addr:
         flash('Email not configured.', 'warning')
         return redirect(url_for('admin.admin_panel'))
@@ -384,7 +372,7 @@ def test_email():
     Sent at: ''' + str(db.func.now())
     
     if send_email(test_email_addr, subject, body):
-        flash(f'Test email sent successfully to {test_email_addr}!', 'success')
+        flash(f'Test email queued for {test_email_addr}. Check delivery with `flask email-status`.', 'success')
     else:
         flash('Failed to send test email. Check your SMTP configuration.', 'danger')
     
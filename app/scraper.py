@@ -8,12 +8,101 @@ import time
 from datetime import datetime, timedelta
 import json
 import hashlib
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Tuple, Optional
+from config import Config
+from .search_cache import SearchResultCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Keep-alive sessions shared by every analyzer, one per remote host
+_host_sessions: Dict[str, requests.Session] = {}
+_host_sessions_lock = threading.Lock()
+
+def get_host_session(url: str, headers: Optional[Dict] = None) -> requests.Session:
+    """Return a pooled keep-alive session for the host of the given URL"""
+    host = urllib.parse.urlsplit(url).netloc
+    with _host_sessions_lock:
+        session = _host_sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            if headers:
+                session.headers.update(headers)
+            _host_sessions[host] = session
+        return session
+
+class HostRateLimiter:
+    """Enforce a minimum interval between requests to the same host"""
+
+    def __init__(self, min_interval: float = 0.5):
+        self.min_interval = min_interval
+        self._next_allowed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str, deadline: Optional[float] = None) -> bool:
+        """Block until the host may be hit again. Returns False if that would pass the deadline."""
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed.get(host, now))
+            if deadline is not None and slot >= deadline:
+                return False
+            self._next_allowed[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+# Per-host limits are shared across analyzers so concurrent verifications stay polite
+host_rate_limiter = HostRateLimiter()
+
+# Search pages already fetched by any worker are reused until they expire
+search_cache = SearchResultCache(
+    Config.SEARCH_CACHE_PATH,
+    ttl=Config.SEARCH_CACHE_TTL,
+    max_entries=Config.SEARCH_CACHE_MAX_ENTRIES
+)
+
+# Local scoring vocabulary, built once per process instead of on every call
+_WORD = re.compile(r'\w+')
+_NUMERIC_DATE = re.compile(r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b')
+STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are',
+    'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
+    'could', 'should'
+})
+# Day and month names that mark a story as recent
+DATE_WORDS = frozenset({
+    'today', 'yesterday', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday',
+    'january', 'february', 'march', 'april', 'may', 'june', 'july', 'august', 'september', 'october',
+    'november', 'december'
+})
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens (runs of letters, digits and underscores)"""
+    return _WORD.findall(text.lower()) if text else []
+
+class ScoringText:
+    """
+    An article tokenized once and shared by every local scoring stage
+    (keyword extraction, query building, content quality).
+    """
+    __slots__ = ('title_tokens', 'content_lower', 'content_tokens', 'keywords')
+
+    def __init__(self, title: str, content: str):
+        self.title_tokens = tokenize(title)
+        self.content_lower = content.lower() if content else ''
+        self.content_tokens = _WORD.findall(self.content_lower)
+        self.keywords = None
+
 class NewsCredibilityAnalyzer:
     """
     Professional news credibility analysis system that evaluates articles 
@@ -162,84 +251,140 @@ class NewsCredibilityAnalyzer:
             'fake news', 'hoax', 'misleading'
         ]
 
+        # Concurrency limits for source coverage checks
+        self.max_workers = 8           # Bounded worker pool size
+        self.request_timeout = 8       # Per-request timeout in seconds
+        self.coverage_deadline = 20.0  # Overall budget for all sources in seconds
+
+    def prepare(self, title: str, content: str) -> ScoringText:
+        """Tokenize an article once for all local scoring stages"""
+        return ScoringText(title, content)
+
     def clean_text(self, text: str) -> str:
         """Clean and normalize text for better matching"""
-        if not text:
-            return ""
-        # Remove extra whitespace and special characters
-        text = re.sub(r'\s+', ' ', text.strip())
-        text = re.sub(r'[^\w\s]', ' ', text)
-        return text.lower()
-
-    def extract_keywords(self, title: str, content: str) -> List[str]:
+        return ' '.join(tokenize(text))
+
+    def extract_keywords(self, title: str, content: str, text: Optional[ScoringText] = None) -> List[str]:
         """Extract relevant keywords for better search results"""
-        text = f"{title} {content}"
-        # Remove common words
-        stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should'}
-        
-        words = re.findall(r'\b\w{3,}\b', text.lower())
-        keywords = [word for word in words if word not in stop_words]
-        
-        # Get most frequent keywords (top 10)
-        word_freq = {}
-        for word in keywords:
-            word_freq[word] = word_freq.get(word, 0) + 1
-        
-        return sorted(word_freq.keys(), key=lambda x: word_freq[x], reverse=True)[:10]
+        text = text or self.prepare(title, content)
+        if text.keywords is None:
+            # Count every token in C, then drop short and common words from the (much smaller) key set
+            counts = Counter(text.title_tokens)
+            counts.update(text.content_tokens)
+            word_freq = {word: n for word, n in counts.items() if len(word) > 2 and word not in STOP_WORDS}
+            # Most frequent keywords (top 10), ties in order of first appearance
+            text.keywords = sorted(word_freq, key=word_freq.__getitem__, reverse=True)[:10]
+        return text.keywords
+
+    def normalize_query(self, query: str) -> str:
+        """Normalize a search query so equivalent searches share a cache entry"""
+        return ' '.join(self.clean_text(query).split())
+
+    def page_tokens(self, html: str) -> str:
+        """Reduce a search page to its sorted set of matchable words"""
+        return ' '.join(sorted({word for word in self.clean_text(html).split() if len(word) > 3}))
+
+    def _fetch_page_tokens(self, source_id: str, source_info: Dict, query: str,
+                           deadline: float) -> Optional[str]:
+        """Return the page token set for a query, from the cache or the network"""
+        tokens = search_cache.get(source_id, query)
+        if tokens is not None:
+            return tokens
+        url = source_info['search_url'].format(query=urllib.parse.quote_plus(query))
+        if not host_rate_limiter.wait(url, deadline):
+            return None
+        logger.info(f"Checking {source_info['name']}: {url}")
+        session = get_host_session(url, self.headers)
+        timeout = min(self.request_timeout, max(deadline - time.monotonic(), 0.1))
+        response = session.get(url, timeout=timeout)
+        if response.status_code != 200:
+            return None
+        tokens = self.page_tokens(response.text)
+        search_cache.set(source_id, query, tokens)
+        return tokens
+
+    def _check_single_source(self, source_id: str, source_info: Dict, queries: List[str],
+                             title_words: List[str], deadline: float) -> Optional[float]:
+        """Search one trusted source. Returns the match ratio when coverage is found, else None."""
+        for query in queries:
+            if deadline - time.monotonic() <= 0:
+                break
+            try:
+                page_text = self._fetch_page_tokens(source_id, source_info, query, deadline)
+                if page_text is None:
+                    continue
+
+                # Check for title match or keyword presence
+                matches = sum(1 for word in title_words if len(word) > 3 and word in page_text)
+                match_ratio = matches / len(title_words) if title_words else 0
+
+                if match_ratio > 0.3:  # At least 30% of title words found
+                    return match_ratio
+            except Exception as e:
+                logger.warning(f"Failed to check {source_info['name']}: {str(e)}")
+        return None
+
+    def check_source_coverage(self, title: str, content: str,
+                              text: Optional[ScoringText] = None) -> Tuple[float, Dict]:
+        """
+        Check how many trusted sources cover this story.
+        Sources are queried concurrently; once coverage_deadline seconds have passed
+        the score is computed from whatever finished, with unchecked sources counted as not found.
+        """
+        text = text or self.prepare(title, content)
+        keywords = self.extract_keywords(title, content, text)
+        primary_query = self.normalize_query(title[:100])  # Limit query length
+        secondary_queries = [self.normalize_query(' '.join(keywords[:3]))]
+        queries = [primary_query] + secondary_queries
+        title_words = text.title_tokens
 
-    def check_source_coverage(self, title: str, content: str) -> Tuple[float, Dict]:
-        """Check how many trusted sources cover this story"""
-        keywords = self.extract_keywords(title, content)
-        primary_query = urllib.parse.quote_plus(title[:100])  # Limit query length
-        secondary_queries = [urllib.parse.quote_plus(' '.join(keywords[:3]))]
-        
         source_results = {}
         total_weight = 0
         covered_weight = 0
-        
+        deadline = time.monotonic() + self.coverage_deadline
+
         for source_id, source_info in self.trusted_sources.items():
-            source_results[source_id] = {'found': False, 'weight': source_info['credibility_weight']}
+            source_results[source_id] = {'found': False, 'checked': False,
+                                         'weight': source_info['credibility_weight']}
             total_weight += source_info['credibility_weight']
-            
-            # Try multiple query variations
-            for query in [primary_query] + secondary_queries:
-                if source_results[source_id]['found']:
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='source-check')
+        try:
+            pending = {
+                executor.submit(self._check_single_source, source_id, source_info, queries, title_words, deadline): source_id
+                for source_id, source_info in self.trusted_sources.items()
+            }
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
                     break
-                    
-                try:
-                    url = source_info['search_url'].format(query=query)
-                    logger.info(f"Checking {source_info['name']}: {url}")
-                    
-                    response = requests.get(url, headers=self.headers, timeout=8)
-                    if response.status_code == 200:
-                        page_text = self.clean_text(response.text)
-                        title_clean = self.clean_text(title)
-                        
-                        # Check for title match or keyword presence
-                        title_words = title_clean.split()
-                        matches = sum(1 for word in title_words if len(word) > 3 and word in page_text)
-                        match_ratio = matches / len(title_words) if title_words else 0
-                        
-                        if match_ratio > 0.3:  # At least 30% of title words found
-                            source_results[source_id]['found'] = True
-                            covered_weight += source_info['credibility_weight']
-                            logger.info(f"✅ Found coverage on {source_info['name']} (match ratio: {match_ratio:.2f})")
-                            break
-                        
-                except Exception as e:
-                    logger.warning(f"Failed to check {source_info['name']}: {str(e)}")
-                
-                time.sleep(0.5)  # Rate limiting
-        
+                done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source_id = pending.pop(future)
+                    source_info = self.trusted_sources[source_id]
+                    source_results[source_id]['checked'] = True
+                    match_ratio = future.result()
+                    if match_ratio is not None:
+                        source_results[source_id]['found'] = True
+                        covered_weight += source_info['credibility_weight']
+                        logger.info(f"✅ Found coverage on {source_info['name']} (match ratio: {match_ratio:.2f})")
+            if pending:
+                skipped = ', '.join(self.trusted_sources[sid]['name'] for sid in pending.values())
+                logger.warning(f"Source coverage deadline reached; returning partial score without: {skipped}")
+        finally:
+            # Do not block on stragglers; their per-request timeouts are capped by the deadline
+            executor.shutdown(wait=False, cancel_futures=True)
+
         coverage_score = (covered_weight / total_weight) * 100 if total_weight > 0 else 0
         logger.info(f"Source coverage score: {coverage_score:.1f}%")
-        
+
         return coverage_score, source_results
 
-    def analyze_content_quality(self, title: str, content: str) -> float:
+    def analyze_content_quality(self, title: str, content: str, text: Optional[ScoringText] = None) -> float:
         """Analyze content quality indicators"""
         if not content or len(content) < 50:
             return 20.0
+        text = text or self.prepare(title, content)
         
         quality_score = 50.0  # Base score
         
@@ -251,17 +396,15 @@ class NewsCredibilityAnalyzer:
         if len(content) > 1000:
             quality_score += 5
         
-        # Structure indicators
-        sentences = content.split('.')
-        if len(sentences) > 3:
+        # Structure indicators: more than 3 sentences, more than 1 paragraph
+        if content.count('.') > 2:
             quality_score += 5
         
-        paragraphs = content.split('\n\n')
-        if len(paragraphs) > 1:
+        if '\n\n' in content:
             quality_score += 5
         
-        # Credibility boosters
-        content_lower = content.lower()
+        # Credibility boosters (C substring search beats a combined regex for a list this short)
+        content_lower = text.content_lower
         boosters_found = sum(1 for booster in self.credibility_boosters if booster in content_lower)
         quality_score += min(boosters_found * 3, 15)
         
@@ -270,16 +413,8 @@ class NewsCredibilityAnalyzer:
         quality_score -= min(reducers_found * 5, 20)
         
         # Date/time mentions (recent news indicator)
-        date_patterns = [
-            r'\b(today|yesterday|monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b',
-            r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b',
-            r'\b(january|february|march|april|may|june|july|august|september|october|november|december)\b'
-        ]
-        
-        for pattern in date_patterns:
-            if re.search(pattern, content_lower):
-                quality_score += 5
-                break
+        if not DATE_WORDS.isdisjoint(text.content_tokens) or _NUMERIC_DATE.search(content_lower):
+            quality_score += 5
         
         return min(quality_score, 100.0)
 
@@ -296,7 +431,8 @@ class NewsCredibilityAnalyzer:
         for site_url in fact_check_sites:
             try:
                 url = site_url.format(query=query)
-                response = requests.get(url, headers=self.headers, timeout=5)
+                host_rate_limiter.wait(url)
+                response = get_host_session(url, self.headers).get(url, timeout=5)
                 
                 if response.status_code == 200:
                     page_text = response.text.lower()
@@ -308,8 +444,6 @@ class NewsCredibilityAnalyzer:
                         
             except Exception:
                 continue
-            
-            time.sleep(0.3)
         
         return min(max(fact_check_score, 0), 100)
 
@@ -327,11 +461,13 @@ def calculate_credibility_score(title: str, content: str) -> float:
     analyzer = NewsCredibilityAnalyzer()
     
     try:
+        text = analyzer.prepare(title, content)
+
         # 1. Source Coverage Analysis (40% weight)
-        coverage_score, source_results = analyzer.check_source_coverage(title, content)
+        coverage_score, source_results = analyzer.check_source_coverage(title, content, text)
         
         # 2. Content Quality Analysis (35% weight)
-        quality_score = analyzer.analyze_content_quality(title, content)
+        quality_score = analyzer.analyze_content_quality(title, content, text)
         
         # 3. Fact-checking verification (15% weight)
         fact_check_score = analyzer.verify_with_fact_checkers(title)
@@ -0,0 +1,234 @@
+import logging
+import math
+import re
+from collections import namedtuple
+
+from markupsafe import Markup, escape
+from sqlalchemy import text, inspect, false
+from . import db
+from .content import html_to_text
+
+logger = logging.getLogger(__name__)
+
+# Snippet markers are control characters so they survive escaping and never occur in article text
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+# Whether the index exists, per database URL (checked once per process)
+_available = {}
+
+SearchHit = namedtuple('SearchHit', ['article', 'rank', 'snippet'])
+
+class SearchPage:
+    """One page of ranked search results, shaped like a Flask-SQLAlchemy pagination"""
+
+    def __init__(self, items, total, page, per_page):
+        self.items = items
+        self.total = total
+        self.page = page
+        self.per_page = per_page
+
+    @property
+    def pages(self):
+        return max(math.ceil(self.total / self.per_page), 1) if self.per_page else 1
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+def _dialect():
+    return db.engine.dialect.name
+
+def _plain_text(article):
+    """The text the model derived from content at write time, so the index can't drift from it"""
+    if article.plain_text is None:
+        # Saved before the derived columns existed and not backfilled yet
+        return html_to_text(article.content)
+    return article.plain_text
+
+def _fts5_query(q):
+    """Turn free text into a safe FTS5 query: every word must match, last one as a prefix"""
+    words = re.findall(r'\w+', q.lower())
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+def _highlight(snippet):
+    """Escape a raw snippet and turn the match markers into <mark> tags"""
+    escaped = str(escape(snippet or ''))
+    return Markup(escaped.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+def ensure_search_index():
+    """
+    Create the full-text index if it is missing. Returns True when it was just created
+    (the caller should then run rebuild_search_index to fill it).
+    SQLite uses an FTS5 table; PostgreSQL a side table with a GIN-indexed tsvector.
+    """
+    dialect = _dialect()
+    if 'article_search' in inspect(db.engine).get_table_names():
+        _available[str(db.engine.url)] = True
+        return False
+    if dialect == 'sqlite':
+        try:
+            db.session.execute(text(
+                "CREATE VIRTUAL TABLE article_search USING fts5(title, body, tokenize='porter unicode61')"
+            ))
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"SQLite FTS5 unavailable, search falls back to LIKE: {e}")
+            return False
+    elif dialect == 'postgresql':
+        db.session.execute(text('''
+            CREATE TABLE article_search (
+                article_id INTEGER PRIMARY KEY REFERENCES article (id) ON DELETE CASCADE,
+                title TEXT NOT NULL,
+                body TEXT NOT NULL,
+                document TSVECTOR NOT NULL
+            )
+        '''))
+        db.session.execute(text('CREATE INDEX ix_article_search_document ON article_search USING GIN (document)'))
+    else:
+        return False
+    db.session.commit()
+    _available[str(db.engine.url)] = True
+    return True
+
+def _index_available():
+    key = str(db.engine.url)
+    if key not in _available:
+        _available[key] = _dialect() in ('sqlite', 'postgresql') and \
+            'article_search' in inspect(db.engine).get_table_names()
+    return _available[key]
+
+def index_article(article):
+    """Add or refresh one article in the index (call after submit and edit, inside the caller's transaction)"""
+    if not _index_available():
+        return
+    # plain_text is recomputed from content when the article is flushed
+    db.session.flush()
+    params = {'id': article.id, 'title': article.title or '', 'body': _plain_text(article)}
+    if _dialect() == 'sqlite':
+        db.session.execute(text('DELETE FROM article_search WHERE rowid = :id'), params)
+        db.session.execute(text('INSERT INTO article_search (rowid, title, body) VALUES (:id, :title, :body)'), params)
+    else:
+        db.session.execute(text('''
+            INSERT INTO article_search (article_id, title, body, document)
+            VALUES (:id, :title, :body,
+                    setweight(to_tsvector('english', :title), 'A') || setweight(to_tsvector('english', :body), 'B'))
+            ON CONFLICT (article_id) DO UPDATE
+            SET title = EXCLUDED.title, body = EXCLUDED.body, document = EXCLUDED.document
+        '''), params)
+
+def remove_article(article_id):
+    """Drop an article from the index (PostgreSQL also cascades on delete)"""
+    if not _index_available():
+        return
+    if _dialect() == 'sqlite':
+        db.session.execute(text('DELETE FROM article_search WHERE rowid = :id'), {'id': article_id})
+    else:
+        db.session.execute(text('DELETE FROM article_search WHERE article_id = :id'), {'id': article_id})
+
+def rebuild_search_index(batch_size=500):
+    """Re-index every article in batches; returns the number indexed"""
+    from .models import Article
+    if not _index_available():
+        return 0
+    db.session.execute(text('DELETE FROM article_search'))
+    count = 0
+    last_id = 0
+    while True:
+        batch = Article.query.filter(Article.id > last_id).order_by(Article.id).limit(batch_size).all()
+        if not batch:
+            break
+        for article in batch:
+            index_article(article)
+        count += len(batch)
+        last_id = batch[-1].id
+        db.session.commit()
+    db.session.commit()
+    return count
+
+def _matching_ids_sql():
+    if _dialect() == 'sqlite':
+        return 'SELECT rowid FROM article_search WHERE article_search MATCH :q'
+    return "SELECT article_id FROM article_search WHERE document @@ websearch_to_tsquery('english', :q)"
+
+def match_filter(q):
+    """
+    SQLAlchemy criterion restricting an Article query to full-text matches,
+    for callers that keep their own ordering and pagination (e.g. the admin panel).
+    """
+    from .models import Article
+    if not _index_available():
+        return Article.title.ilike(f"%{q}%") | Article.content.ilike(f"%{q}%")
+    query = _fts5_query(q) if _dialect() == 'sqlite' else q
+    if not query:
+        return false()
+    return Article.id.in_(text(_matching_ids_sql()).bindparams(q=query))
+
+def search_articles(q, status='approved', page=1, per_page=10):
+    """Ranked full-text search with highlighted snippets, one page at a time"""
+    from .models import Article
+    page = max(page, 1)
+    offset = (page - 1) * per_page
+    if not _index_available():
+        base = Article.query.filter(Article.status == status, match_filter(q))
+        total = base.count()
+        articles = base.order_by(Article.created_at.desc()).offset(offset).limit(per_page).all()
+        hits = [SearchHit(a, 0.0, _highlight(_plain_text(a)[:200])) for a in articles]
+        return SearchPage(hits, total, page, per_page)
+
+    if _dialect() == 'sqlite':
+        query = _fts5_query(q)
+        if not query:
+            return SearchPage([], 0, page, per_page)
+        params = {'q': query, 'status': status, 'limit': per_page, 'offset': offset}
+        total = db.session.execute(text('''
+            SELECT COUNT(*) FROM article_search JOIN article ON article.id = article_search.rowid
+            WHERE article_search MATCH :q AND article.status = :status
+        '''), params).scalar()
+        rows = db.session.execute(text(f'''
+            SELECT article.id, -bm25(article_search, 10.0, 1.0) AS rank,
+                   snippet(article_search, 1, '{_MARK_START}', '{_MARK_END}', '…', 24) AS snippet
+            FROM article_search JOIN article ON article.id = article_search.rowid
+            WHERE article_search MATCH :q AND article.status = :status
+            ORDER BY bm25(article_search, 10.0, 1.0)
+            LIMIT :limit OFFSET :offset
+        '''), params).all()
+    else:
+        params = {'q': q, 'status': status, 'limit': per_page, 'offset': offset}
+        total = db.session.execute(text('''
+            SELECT COUNT(*) FROM article_search JOIN article ON article.id = article_search.article_id
+            WHERE article_search.document @@ websearch_to_tsquery('english', :q) AND article.status = :status
+        '''), params).scalar()
+        rows = db.session.execute(text(f'''
+            WITH hits AS (
+                SELECT article_search.article_id, article_search.body,
+                       ts_rank_cd(article_search.document, websearch_to_tsquery('english', :q)) AS rank
+                FROM article_search JOIN article ON article.id = article_search.article_id
+                WHERE article_search.document @@ websearch_to_tsquery('english', :q) AND article.status = :status
+                ORDER BY rank DESC, article_search.article_id DESC
+                LIMIT :limit OFFSET :offset
+            )
+            SELECT article_id, rank,
+                   ts_headline('english', body, websearch_to_tsquery('english', :q),
+                               'StartSel={_MARK_START}, StopSel={_MARK_END}, MaxWords=35, MinWords=15, MaxFragments=1')
+            FROM hits ORDER BY rank DESC, article_id DESC
+        '''), params).all()
+
+    articles = {a.id: a for a in Article.query.filter(Article.id.in_([r[0] for r in rows]))} if rows else {}
+    hits = [SearchHit(articles[r[0]], r[1], _highlight(r[2])) for r in rows if r[0] in articles]
+    return SearchPage(hits, total, page, per_page)
@@ -0,0 +1,168 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+import logging
+from collections import Counter
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class SearchResultCache:
+    """
+    On-disk cache of trusted-source search pages shared by every gunicorn worker.
+    Entries are keyed by (source_id, normalized query) and hold the compact token
+    set of the cleaned page, with TTL expiry and LRU eviction.
+    Lookups only read the file: hit/miss counters and LRU access times are kept in
+    memory and written in one transaction with the next set(), or at most every
+    `flush_interval` seconds, so workers don't queue for the write lock on the read path.
+    """
+
+    def __init__(self, path: str, ttl: int = 6 * 3600, max_entries: int = 5000, flush_interval: float = 30.0):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self._ready = False
+        self._lock = threading.Lock()
+        self._counts = Counter()  # name -> lookups not yet written
+        self._touched = {}        # (source_id, query) -> last access not yet written
+        self._flushed_at = time.monotonic()
+        atexit.register(self.flush)
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5)
+        if not self._ready:
+            try:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS search_cache (
+                        source_id TEXT NOT NULL,
+                        query TEXT NOT NULL,
+                        tokens TEXT NOT NULL,
+                        fetched_at REAL NOT NULL,
+                        last_access REAL NOT NULL,
+                        PRIMARY KEY (source_id, query)
+                    )
+                ''')
+                conn.execute('CREATE INDEX IF NOT EXISTS ix_search_cache_last_access ON search_cache (last_access)')
+                conn.execute('CREATE TABLE IF NOT EXISTS search_cache_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+                conn.commit()
+            except Exception:
+                conn.close()
+                raise
+            self._ready = True
+        return conn
+
+    def _write_pending(self, conn: sqlite3.Connection):
+        """Add the buffered counters and access times to the current transaction"""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            touched, self._touched = self._touched, {}
+            self._flushed_at = time.monotonic()
+        conn.executemany(
+            'INSERT INTO search_cache_stats (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value', counts.items()
+        )
+        conn.executemany(
+            'UPDATE search_cache SET last_access = MAX(last_access, ?) WHERE source_id = ? AND query = ?',
+            [(at, source_id, query) for (source_id, query), at in touched.items()]
+        )
+
+    def flush(self):
+        """Write buffered counters and access times now"""
+        with self._lock:
+            if not self._counts and not self._touched:
+                return
+        try:
+            conn = self._connect()
+            try:
+                self._write_pending(conn)
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Search cache counter flush failed: {e}")
+
+    def get(self, source_id: str, query: str) -> Optional[str]:
+        """Return the cached token string, or None on a miss or expired entry"""
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    'SELECT tokens, fetched_at FROM search_cache WHERE source_id = ? AND query = ?',
+                    (source_id, query)
+                ).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Search cache read failed: {e}")
+            return None
+        now = time.time()
+        hit = row is not None and now - row[1] < self.ttl
+        with self._lock:
+            self._counts['hits' if hit else 'misses'] += 1
+            if hit:
+                self._touched[(source_id, query)] = now
+            due = time.monotonic() - self._flushed_at >= self.flush_interval
+        if due:
+            self.flush()
+        return row[0] if hit else None
+
+    def set(self, source_id: str, query: str, tokens: str):
+        """Store a token string and evict the least recently used entries beyond max_entries"""
+        try:
+            conn = self._connect()
+            try:
+                now = time.time()
+                conn.execute(
+                    'INSERT OR REPLACE INTO search_cache (source_id, query, tokens, fetched_at, last_access) '
+                    'VALUES (?, ?, ?, ?, ?)', (source_id, query, tokens, now, now)
+                )
+                self._write_pending(conn)
+                conn.execute('DELETE FROM search_cache WHERE fetched_at < ?', (now - self.ttl,))
+                conn.execute(
+                    'DELETE FROM search_cache WHERE rowid IN ('
+                    'SELECT rowid FROM search_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Search cache write failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return hit/miss counters aggregated across all workers plus the current entry count.
+        Other processes' lookups show up once they flush (within flush_interval of their next lookup).
+        """
+        self.flush()
+        stats = {'hits': 0, 'misses': 0, 'entries': 0}
+        try:
+            conn = self._connect()
+            try:
+                for name, value in conn.execute('SELECT name, value FROM search_cache_stats'):
+                    stats[name] = value
+                stats['entries'] = conn.execute('SELECT COUNT(*) FROM search_cache').fetchone()[0]
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Search cache stats failed: {e}")
+        return stats
+
+    def clear(self):
+        """Remove all cached pages and reset the counters"""
+        with self._lock:
+            self._counts.clear()
+            self._touched.clear()
+        conn = self._connect()
+        try:
+            conn.execute('DELETE FROM search_cache')
+            conn.execute('DELETE FROM search_cache_stats')
+            conn.commit()
+        finally:
+            conn.close()
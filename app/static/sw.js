@@ -1,47 +1,123 @@
-// Service Worker for Youth Times Mobile PWA
-const CACHE_NAME = 'youth-times-mobile-v1';
-const urlsToCache = [
-  '/',
-  '/static/css/style.css',
-  '/static/manifest.json',
-  '/static/icon-192.png',
-  '/static/icon-512.png'
-];
+// Service Worker for Youth Times
+// Served from /sw.js with PRECACHE_MANIFEST ({version, urls}) prepended by the server;
+// the version changes whenever the fingerprinted assets or this file change.
+const CACHE_PREFIX = 'youth-times-';
+const PRECACHE = CACHE_PREFIX + 'precache-' + PRECACHE_MANIFEST.version;
+const STATIC_CACHE = CACHE_PREFIX + 'static-' + PRECACHE_MANIFEST.version;
+const PAGES_CACHE = CACHE_PREFIX + 'pages-' + PRECACHE_MANIFEST.version;
+const API_CACHE = CACHE_PREFIX + 'api-' + PRECACHE_MANIFEST.version;
+const CURRENT_CACHES = [PRECACHE, STATIC_CACHE, PAGES_CACHE, API_CACHE];
+const OFFLINE_URL = '/offline';
+const MAX_PAGES = 50;
+const MAX_STATIC = 100;
+// Sign-in and sign-out endpoints (password and Google OAuth)
+const SESSION_PATHS = ['/login', '/logout', '/login/google', '/auth/google/callback'];
+
+const precached = new Set(PRECACHE_MANIFEST.urls);
 
 self.addEventListener('install', function(event) {
   event.waitUntil(
-    caches.open(CACHE_NAME)
-      .then(function(cache) {
-        console.log('Opened cache');
-        return cache.addAll(urlsToCache);
-      })
+    caches.open(PRECACHE)
+      .then(cache => cache.addAll(PRECACHE_MANIFEST.urls))
+      .then(() => self.skipWaiting())
   );
 });
 
-self.addEventListener('fetch', function(event) {
-  event.respondWith(
-    caches.match(event.request)
-      .then(function(response) {
-        // Cache hit - return response
-        if (response) {
-          return response;
-        }
-        return fetch(event.request);
-      }
-    )
+self.addEventListener('activate', function(event) {
+  // Drop every cache from older versions (including the old youth-times-mobile-v1)
+  event.waitUntil(
+    caches.keys()
+      .then(names => Promise.all(
+        names
+          .filter(name => name.startsWith(CACHE_PREFIX) && !CURRENT_CACHES.includes(name))
+          .map(name => caches.delete(name))
+      ))
+      .then(() => self.clients.claim())
   );
 });
 
-self.addEventListener('activate', function(event) {
-  event.waitUntil(
-    caches.keys().then(function(cacheNames) {
-      return Promise.all(
-        cacheNames.map(function(cacheName) {
-          if (cacheName !== CACHE_NAME) {
-            return caches.delete(cacheName);
-          }
-        })
-      );
+function cacheable(response) {
+  return response && response.ok && response.type === 'basic';
+}
+
+function trimCache(cacheName, maxEntries) {
+  return caches.open(cacheName).then(cache =>
+    cache.keys().then(keys => {
+      if (keys.length > maxEntries) {
+        return cache.delete(keys[0]).then(() => trimCache(cacheName, maxEntries));
+      }
     })
   );
+}
+
+function put(cacheName, request, response, maxEntries) {
+  return caches.open(cacheName)
+    .then(cache => cache.put(request, response))
+    .then(() => maxEntries && trimCache(cacheName, maxEntries));
+}
+
+// Fingerprinted and content-hashed files never change under the same URL
+function cacheFirst(event, cacheName, maxEntries) {
+  return caches.match(event.request).then(cached => {
+    if (cached) {
+      return cached;
+    }
+    return fetch(event.request).then(response => {
+      if (cacheable(response)) {
+        event.waitUntil(put(cacheName, event.request, response.clone(), maxEntries));
+      }
+      return response;
+    });
+  });
+}
+
+// Pages and live data: the network answer wins, the cache covers offline
+function networkFirst(event, cacheName, maxEntries) {
+  return fetch(event.request)
+    .then(response => {
+      if (cacheable(response)) {
+        event.waitUntil(put(cacheName, event.request, response.clone(), maxEntries));
+      }
+      return response;
+    })
+    .catch(() => caches.match(event.request, {cacheName: cacheName})
+      .then(cached => cached || offlineResponse(event.request)));
+}
+
+function offlineResponse(request) {
+  if (request.mode === 'navigate') {
+    return caches.match(OFFLINE_URL, {cacheName: PRECACHE});
+  }
+  return Response.error();
+}
+
+self.addEventListener('fetch', function(event) {
+  const request = event.request;
+  const url = new URL(request.url);
+  if (request.method !== 'GET' || url.origin !== self.location.origin) {
+    return;
+  }
+  const path = url.pathname;
+
+  if (path.startsWith('/admin')) {
+    return;
+  }
+  if (SESSION_PATHS.includes(path)) {
+    // Pages rendered for the previous user must not be shown to the next one
+    event.waitUntil(caches.delete(PAGES_CACHE).then(() => caches.delete(API_CACHE)));
+    return;
+  }
+  if (precached.has(path)) {
+    event.respondWith(caches.match(request, {cacheName: PRECACHE}).then(cached => cached || fetch(request)));
+  } else if (path.startsWith('/static/dist/') || path.startsWith('/static/img_cache/') ||
+             path.startsWith('/static/uploads/')) {
+    event.respondWith(cacheFirst(event, STATIC_CACHE, MAX_STATIC));
+  } else if (path.startsWith('/api/weather') || path.startsWith('/api/notifications') ||
+             path === '/notifications') {
+    event.respondWith(networkFirst(event, API_CACHE));
+  } else if (request.mode === 'navigate') {
+    // Article pages included: after a comment POST the redirect must show the new
+    // comment and its flash message, which a cached copy would hide and swallow
+    event.respondWith(networkFirst(event, PAGES_CACHE, MAX_PAGES));
+  }
 });
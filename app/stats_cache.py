@@ -0,0 +1,63 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class StatsCache:
+    """
+    Per-process cache for site-wide aggregate counts (footer and visitor stats).
+    Values live for `timeout` seconds. When a value goes stale the first caller
+    recomputes it while concurrent callers keep getting the stale value, so a
+    slow COUNT never stacks up across requests.
+    """
+
+    def __init__(self, timeout=300, config_key='VISITOR_CACHE_TIMEOUT'):
+        self.timeout = timeout
+        self.config_key = config_key
+        self._values = {}    # key -> (value, expires_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.timeout = app.config.get(self.config_key, self.timeout)
+
+    def get(self, key, loader, default=0):
+        """Return the cached value for key, calling loader() when it is missing or stale"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._values.get(key)
+            if entry and entry[1] > now:
+                return entry[0]
+            if entry and key in self._refreshing:
+                # Someone else is already recomputing; serve the stale value
+                return entry[0]
+            self._refreshing.add(key)
+        try:
+            value = loader()
+        except Exception as e:
+            logger.warning(f"Failed to refresh cached stat '{key}': {e}")
+            return entry[0] if entry else default
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+        with self._lock:
+            self._values[key] = (value, time.monotonic() + self.timeout)
+        return value
+
+    def incr(self, key, delta=1):
+        """Adjust a cached count in place; a missing value is left for the next load"""
+        with self._lock:
+            entry = self._values.get(key)
+            if entry:
+                self._values[key] = (entry[0] + delta, entry[1])
+
+    def invalidate(self, *keys):
+        """Mark values stale; they are still served while the refresh runs"""
+        with self._lock:
+            for key in keys:
+                entry = self._values.get(key)
+                if entry:
+                    self._values[key] = (entry[0], 0)
+
+stats_cache = StatsCache()
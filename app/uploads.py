@@ -0,0 +1,217 @@
+import logging
+import os
+import shutil
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import cloudinary
+import cloudinary.uploader
+from sqlalchemy import or_, and_
+from werkzeug.utils import secure_filename
+from . import db
+from .page_cache import page_cache
+
+logger = logging.getLogger(__name__)
+
+# Configure Cloudinary (for image uploads)
+cloudinary.config(
+    cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
+    api_key=os.getenv('CLOUDINARY_API_KEY'),
+    api_secret=os.getenv('CLOUDINARY_API_SECRET')
+)
+
+ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif'}
+
+class CloudinaryStorage:
+    """Push an image to Cloudinary and return its HTTPS URL"""
+
+    def save(self, path):
+        result = cloudinary.uploader.upload(
+            path,
+            folder="youth_times/articles",
+            transformation=[{'width': 800, 'height': 600, 'crop': 'limit'}]
+        )
+        return result['secure_url']
+
+class LocalStorage:
+    """Stand-in for Cloudinary: copy the image under the static folder and return its URL"""
+
+    def __init__(self, root, url_prefix):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip('/')
+
+    def path_for(self, path):
+        """Where save() puts the file spooled at `path`"""
+        return os.path.join(self.root, 'articles', os.path.basename(path))
+
+    def save(self, path):
+        target = self.path_for(path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        name = os.path.basename(path)
+        tmp = os.path.join(os.path.dirname(target), f'.{name}.tmp')
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, target)  # Never serve a half-written file
+        return f'{self.url_prefix}/articles/{name}'
+
+def storage_backend(app):
+    if app.config.get('UPLOAD_BACKEND') == 'cloudinary':
+        return CloudinaryStorage()
+    return LocalStorage(app.config['LOCAL_UPLOAD_DIR'], f'{app.static_url_path}/uploads')
+
+def spool_upload(file, spool_dir):
+    """Write an uploaded file to local disk under a random name; returns the path or None if not an image"""
+    ext = os.path.splitext(secure_filename(file.filename or ''))[1].lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        return None
+    os.makedirs(spool_dir, exist_ok=True)
+    path = os.path.join(spool_dir, uuid.uuid4().hex + ext)
+    file.save(path)
+    return path
+
+def _claimable(now, host):
+    from .models import ImageUpload
+    return and_(ImageUpload.spool_host == host, or_(
+        and_(ImageUpload.status == 'queued', ImageUpload.available_at <= now),
+        and_(ImageUpload.status == 'uploading', ImageUpload.locked_until < now)
+    ))
+
+def claim_upload(host, lock_timeout=300):
+    """Claim the next due upload spooled on this host (conditional UPDATE, safe across processes)"""
+    from .models import ImageUpload
+    while True:
+        now = datetime.utcnow()
+        upload_id = db.session.query(ImageUpload.id)\
+            .filter(_claimable(now, host))\
+            .order_by(ImageUpload.available_at, ImageUpload.id)\
+            .limit(1).scalar()
+        if upload_id is None:
+            db.session.rollback()
+            return None
+        claimed = ImageUpload.query\
+            .filter(ImageUpload.id == upload_id, _claimable(now, host))\
+            .update({
+                'status': 'uploading',
+                'attempts': ImageUpload.attempts + 1,
+                'locked_until': now + timedelta(seconds=lock_timeout)
+            }, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return db.session.get(ImageUpload, upload_id)
+
+def _discard(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def process_upload(upload, storage, retry_delay=30):
+    """Push one spooled image, patch Article.image_url and remove the spool file"""
+    from .models import Article, ImageUpload
+    upload_id, article_id, path = upload.id, upload.article_id, upload.spool_path
+    done = {'locked_until': None, 'finished_at': datetime.utcnow(), 'last_error': None}
+    if not db.session.query(Article.id).filter_by(id=article_id).first():
+        # Article was deleted (e.g. failed verification) before its image went up
+        _discard(path)
+        ImageUpload.query.filter_by(id=upload_id).update(dict(done, status='done'))
+        db.session.commit()
+        return
+    try:
+        url = storage.save(path)
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Image upload {upload_id} for article {article_id} failed (attempt {upload.attempts}): {e}")
+        if upload.attempts >= upload.max_attempts or not os.path.exists(path):
+            update = {'status': 'failed', 'locked_until': None, 'finished_at': datetime.utcnow()}
+        else:
+            update = {'status': 'queued', 'locked_until': None,
+                      'available_at': datetime.utcnow() + timedelta(seconds=retry_delay * (2 ** (upload.attempts - 1)))}
+        update['last_error'] = str(e)[:2000]
+        ImageUpload.query.filter_by(id=upload_id).update(update)
+        db.session.commit()
+        return
+    if isinstance(storage, LocalStorage):
+        # Cloudinary resizes on its side; local images get their responsive variants here
+        from flask import current_app
+        from .images import build_variants
+        try:
+            build_variants(storage.path_for(path), url, current_app)
+        except Exception as e:
+            logger.warning(f"Could not build image variants for article {article_id}: {e}")
+    Article.query.filter_by(id=article_id).update({'image_url': url}, synchronize_session=False)
+    ImageUpload.query.filter_by(id=upload_id).update(dict(done, status='done'))
+    db.session.commit()
+    page_cache.bump()  # Cached copies of the article still point at the old image
+    _discard(path)
+
+class Uploader:
+    """
+    Background uploader for spooled article images. A thread is started by the first
+    request each process serves (so forked gunicorn workers get their own), drains what
+    an earlier process left in the spool, then is woken whenever a request queues an
+    upload and polls every `poll_interval` seconds. It only claims files spooled on this
+    host, which is why this runs inside the web process rather than a separate worker.
+    """
+
+    def __init__(self, poll_interval=30.0):
+        self.poll_interval = poll_interval
+        self.host = socket.gethostname()
+        self._app = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def init_app(self, app):
+        self._app = app
+        app.before_request(self._ensure_started)
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='image-uploader', daemon=True)
+                self._thread.start()
+
+    def queue(self, article_id, spool_path, max_attempts=5):
+        """Add an upload job to the current session; call wake() after the commit"""
+        from .models import ImageUpload
+        job = ImageUpload(article_id=article_id, spool_path=spool_path, spool_host=self.host,
+                          max_attempts=max_attempts)
+        db.session.add(job)
+        return job
+
+    def wake(self):
+        self._start()
+        self._wakeup.set()
+
+    def drain(self, app=None):
+        """Process every due upload on this host; returns the number processed"""
+        app = app or self._app
+        processed = 0
+        with app.app_context():
+            storage = storage_backend(app)
+            try:
+                while True:
+                    upload = claim_upload(self.host)
+                    if upload is None:
+                        break
+                    process_upload(upload, storage)
+                    processed += 1
+            finally:
+                db.session.remove()
+        return processed
+
+    def _run(self):
+        while True:
+            try:
+                self.drain()
+            except Exception:
+                logger.exception("Image uploader error")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+uploader = Uploader()
@@ -1,24 +1,115 @@
 import requests
+from requests.adapters import HTTPAdapter
 from flask import current_app
 import logging
+import threading
+import time
+from collections import OrderedDict
 
 logger = logging.getLogger(__name__)
 
+# Keep-alive connection pool to api.weatherapi.com shared by all requests in this process
+_session = requests.Session()
+_session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=10))
+_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=10))
+
+class WeatherCache:
+    """
+    Per-process TTL cache with single-flight loading and stale-while-revalidate.
+    Fresh entries are returned directly; entries older than `ttl` but younger than
+    `stale_ttl` are returned immediately while one background thread refreshes them.
+    Concurrent misses for the same key wait for a single upstream call. Keys come from
+    the client (city names), so at most `max_entries` are kept in LRU order and entries
+    past `stale_ttl` are dropped.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, fetched_at)
+        self._inflight = {}            # key -> threading.Event
+        self._lock = threading.Lock()
+
+    def get(self, key, loader, ttl, stale_ttl, wait_timeout=12):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[1] >= stale_ttl:
+                del self._entries[key]
+                entry = None
+            if entry:
+                self._entries.move_to_end(key)
+                if now - entry[1] < ttl:
+                    return entry[0]
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+        if entry:
+            if leader:
+                threading.Thread(target=self._load, args=(key, loader, event, stale_ttl), daemon=True).start()
+            return entry[0]
+        if leader:
+            self._load(key, loader, event, stale_ttl)
+        else:
+            event.wait(wait_timeout)
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def _load(self, key, loader, event, stale_ttl):
+        try:
+            value = loader()
+            if value is not None:
+                with self._lock:
+                    now = time.monotonic()
+                    self._entries[key] = (value, now)
+                    self._entries.move_to_end(key)
+                    for old_key in [k for k, (_, fetched_at) in self._entries.items() if now - fetched_at >= stale_ttl]:
+                        del self._entries[old_key]
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+weather_cache = WeatherCache()
+
 class WeatherService:
     """Service for fetching weather data from WeatherAPI.com"""
     BASE_URL = "http://api.weatherapi.com/v1"
 
+    @staticmethod
+    def _cache_settings():
+        return (current_app.config.get('WEATHER_CACHE_TTL', 600),
+                current_app.config.get('WEATHER_STALE_TTL', 3600))
+
     @staticmethod
     def get_weather_by_city(city_name="Bhubaneswar"):
         """
-        Get current weather for a city using WeatherAPI.com
+        Get current weather for a city (cached per city, see WeatherCache)
         """
-        try:
-            api_key = current_app.config.get('WEATHER_API_KEY')
-            if not api_key:
-                logger.error("WeatherAPI key not configured")
-                return None
+        api_key = current_app.config.get('WEATHER_API_KEY')
+        if not api_key:
+            logger.error("WeatherAPI key not configured")
+            return None
+        ttl, stale_ttl = WeatherService._cache_settings()
+        return weather_cache.get(
+            ('current', city_name.strip().lower()),
+            lambda: WeatherService._fetch_weather(api_key, city_name),
+            ttl, stale_ttl
+        )
 
+    @staticmethod
+    def _fetch_weather(api_key, city_name):
+        """
+        Fetch current weather for a city from WeatherAPI.com
+        """
+        try:
             url = f"{WeatherService.BASE_URL}/current.json"
             params = {
                 'key': api_key,
@@ -26,7 +117,7 @@ class WeatherService:
                 'aqi': 'no'
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            response = _session.get(url, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
 
@@ -62,15 +153,26 @@ class WeatherService:
     @staticmethod
     def get_forecast(city_name="Bhubaneswar", days=5):
         """
-        Get weather forecast for a city using WeatherAPI.com
+        Get weather forecast for a city (cached per city and day count)
         Returns forecast for the next 'days' days
         """
-        try:
-            api_key = current_app.config.get('WEATHER_API_KEY')
-            if not api_key:
-                logger.error("WeatherAPI key not configured")
-                return None
+        api_key = current_app.config.get('WEATHER_API_KEY')
+        if not api_key:
+            logger.error("WeatherAPI key not configured")
+            return None
+        ttl, stale_ttl = WeatherService._cache_settings()
+        return weather_cache.get(
+            ('forecast', city_name.strip().lower(), days),
+            lambda: WeatherService._fetch_forecast(api_key, city_name, days),
+            ttl, stale_ttl
+        )
 
+    @staticmethod
+    def _fetch_forecast(api_key, city_name, days):
+        """
+        Fetch the forecast for a city from WeatherAPI.com
+        """
+        try:
             url = f"{WeatherService.BASE_URL}/forecast.json"
             params = {
                 'key': api_key,
@@ -80,7 +182,7 @@ class WeatherService:
                 'alerts': 'no'
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            response = _session.get(url, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
 
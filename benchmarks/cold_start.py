@@ -0,0 +1,62 @@
+"""
+Measure worker cold start: a fresh interpreter importing the app, building it with
+create_app() and serving its first request. Each run is a separate process, like a
+gunicorn worker boot.
+
+    python benchmarks/cold_start.py --runs 10
+    python benchmarks/cold_start.py --runs 10 --with-upgrade   # include `db-upgrade` in each boot
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, sys, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+if sys.argv[1] == '1':
+    from app.migrations import upgrade
+    with app.app_context():
+        upgrade()
+t3 = time.perf_counter()
+status = app.test_client().get(sys.argv[2]).status_code
+t4 = time.perf_counter()
+print(json.dumps({'import': t1 - t0, 'create_app': t2 - t1, 'upgrade': t3 - t2,
+                  'first_request': t4 - t3, 'total': t4 - t0, 'status': status}))
+'''
+
+def run_once(with_upgrade, path):
+    out = subprocess.run(
+        [sys.executable, '-c', CHILD, '1' if with_upgrade else '0', path],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    # The app prints migration notes; the timings are the last line
+    return json.loads(out.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--path', default='/', help='URL of the first request')
+    parser.add_argument('--with-upgrade', action='store_true', help='Run the migration step in every boot')
+    args = parser.parse_args()
+
+    # Warm the OS page cache and make sure the schema exists before timing
+    run_once(True, args.path)
+
+    samples = [run_once(args.with_upgrade, args.path) for _ in range(args.runs)]
+    print(f"{args.runs} cold starts (first request {args.path} -> {samples[-1]['status']})")
+    for phase in ('import', 'create_app', 'upgrade', 'first_request', 'total'):
+        values = [s[phase] * 1000 for s in samples]
+        print(f"  {phase:<14} median {statistics.median(values):8.1f} ms   "
+              f"min {min(values):8.1f} ms   max {max(values):8.1f} ms")
+
+if __name__ == '__main__':
+    main()
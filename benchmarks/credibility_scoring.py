@@ -0,0 +1,111 @@
+"""
+Measure local credibility scoring throughput (articles/sec): keyword extraction, title
+cleaning and content-quality scoring, i.e. everything calculate_credibility_score does
+before it goes to the network. The corpus is generated from a fixed seed so runs are
+comparable across commits; pass --corpus to score real articles instead.
+
+    python benchmarks/credibility_scoring.py
+    python benchmarks/credibility_scoring.py --articles 5000 --runs 5
+    python benchmarks/credibility_scoring.py --write-corpus corpus.jsonl   # save the generated corpus
+    python benchmarks/credibility_scoring.py --corpus corpus.jsonl --json  # one JSON line for tracking
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+VOCABULARY = (
+    'government minister district police students college university council budget '
+    'election hospital farmers water supply road project flood cyclone rainfall temple '
+    'festival market prices railway station airport company employees protest strike '
+    'court judge verdict teachers examination results scholarship technology startup '
+    'village panchayat collector officials meeting development scheme health doctors '
+    'vaccine patients cricket match team tournament players coach stadium energy power '
+    'report survey data analysis research committee inquiry investigation evidence'
+).split()
+FILLER = 'the a of to in and for on with by was were has have is are said will from at'.split()
+PHRASES = [
+    'official statement', 'government announces', 'according to sources', 'confirmed reports',
+    'police confirm', 'ministry says', 'spokesperson said', 'press release', 'eye witness',
+    'allegedly', 'unconfirmed', 'speculation', 'viral post', 'whatsapp forward', 'hoax',
+    'social media claims', 'rumored', 'misleading',
+]
+DATES = ['today', 'yesterday', 'on Monday', 'last Friday', 'in March', 'on 12/03/2025',
+         'by 5-6-24', 'this December']
+
+def _sentence(rng):
+    words = [rng.choice(VOCABULARY if rng.random() < 0.6 else FILLER) for _ in range(rng.randint(6, 22))]
+    if rng.random() < 0.15:
+        words.insert(rng.randrange(len(words)), rng.choice(PHRASES))
+    if rng.random() < 0.08:
+        words.insert(rng.randrange(len(words)), rng.choice(DATES))
+    if rng.random() < 0.1:
+        words.insert(rng.randrange(len(words)), f'"{rng.choice(VOCABULARY).title()}",')
+    return ' '.join(words).capitalize() + rng.choice('...!?')[0]
+
+def build_corpus(count, seed=2025):
+    """`count` synthetic (title, content) pairs, from 40 characters to a few thousand"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        title = ' '.join(rng.choice(VOCABULARY) for _ in range(rng.randint(4, 12))).title()
+        paragraphs = [' '.join(_sentence(rng) for _ in range(rng.randint(1, 6)))
+                      for _ in range(rng.choice([1, 1, 2, 3, 5, 8]))]
+        corpus.append((title, '\n\n'.join(paragraphs)))
+    return corpus
+
+def load_corpus(path):
+    with open(path, encoding='utf-8') as f:
+        return [(row['title'], row['content']) for row in map(json.loads, f)]
+
+def score_all(analyzer, corpus):
+    for title, content in corpus:
+        text = analyzer.prepare(title, content)
+        analyzer.extract_keywords(title, content, text)
+        analyzer.normalize_query(title[:100])
+        analyzer.analyze_content_quality(title, content, text)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=3000, help='Size of the generated corpus')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--corpus', help='JSON lines file with title/content fields')
+    parser.add_argument('--write-corpus', metavar='PATH', help='Save the generated corpus and exit')
+    parser.add_argument('--json', action='store_true', help='Print one JSON result line')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else build_corpus(args.articles)
+    if args.write_corpus:
+        with open(args.write_corpus, 'w', encoding='utf-8') as f:
+            for title, content in corpus:
+                f.write(json.dumps({'title': title, 'content': content}) + '\n')
+        print(f'Wrote {len(corpus)} articles to {args.write_corpus}')
+        return
+
+    from app.scraper import NewsCredibilityAnalyzer
+    analyzer = NewsCredibilityAnalyzer()
+    score_all(analyzer, corpus[:100])  # Warm up compiled patterns
+
+    rates = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        score_all(analyzer, corpus)
+        rates.append(len(corpus) / (time.perf_counter() - start))
+
+    chars = sum(len(content) for _, content in corpus)
+    if args.json:
+        print(json.dumps({'articles': len(corpus), 'chars': chars, 'runs': args.runs,
+                          'articles_per_sec': round(statistics.median(rates), 1)}))
+        return
+    print(f'{len(corpus)} articles ({chars / len(corpus):.0f} chars on average), {args.runs} runs')
+    print(f'  median {statistics.median(rates):10.1f} articles/sec   '
+          f'min {min(rates):10.1f}   max {max(rates):10.1f}')
+
+if __name__ == '__main__':
+    main()
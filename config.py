@@ -32,6 +32,58 @@ class Config:
 
     # WeatherAPI.com API
     WEATHER_API_KEY = os.getenv('WEATHER_API_KEY')
+    WEATHER_CACHE_TTL = int(os.getenv('WEATHER_CACHE_TTL', 600))  # Serve cached weather for 10 minutes
+    WEATHER_STALE_TTL = int(os.getenv('WEATHER_STALE_TTL', 3600))  # Then serve stale while refreshing, up to 1 hour
+
+    # Cache configuration for footer and visitor stats
+    VISITOR_CACHE_TIMEOUT = int(os.getenv('VISITOR_CACHE_TIMEOUT', 300))  # 5 minutes
+
+    # Seconds a logged-in user's id/username/role snapshot is reused before re-reading the user row
+    IDENTITY_CACHE_TTL = int(os.getenv('IDENTITY_CACHE_TTL', 60))
+    # Seconds between checks of the shared counter that admin user changes bump in every process
+    IDENTITY_VERSION_POLL = float(os.getenv('IDENTITY_VERSION_POLL', 2.0))
+
+    # Full-page cache for anonymous GETs of public pages, keyed by path + query + content version
+    PAGE_CACHE_ENABLED = os.getenv('PAGE_CACHE_ENABLED', 'true').lower() in ('true', '1', 'yes')
+    PAGE_CACHE_MAX_ENTRIES = int(os.getenv('PAGE_CACHE_MAX_ENTRIES', 500))
+    PAGE_CACHE_TTL = int(os.getenv('PAGE_CACHE_TTL', 300))
+    # How often each process re-reads the shared content version (seconds)
+    PAGE_CACHE_VERSION_POLL = float(os.getenv('PAGE_CACHE_VERSION_POLL', 5))
+
+    # Notifications: seconds the navbar unread count is cached, days read notifications are kept
+    NOTIFICATION_UNREAD_CACHE_TIMEOUT = int(os.getenv('NOTIFICATION_UNREAD_CACHE_TIMEOUT', 60))
+    NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 90))
+
+    # Public site URL for links in emails sent outside a request (newsletter digest)
+    SITE_URL = os.getenv('SITE_URL', 'http://localhost:5000')
+
+    # Newsletter digest: subscribers loaded per chunk (progress is saved after each) and parallel SMTP connections
+    DIGEST_CHUNK_SIZE = int(os.getenv('DIGEST_CHUNK_SIZE', 200))
+    DIGEST_CONCURRENCY = int(os.getenv('DIGEST_CONCURRENCY', 4))
+
+    # Article image uploads: spooled here during the request, then pushed by a background uploader.
+    # Backend is 'cloudinary' or 'local' (files served from app/static/uploads); defaults to cloudinary when configured
+    UPLOAD_SPOOL_DIR = os.getenv('UPLOAD_SPOOL_DIR', os.path.join(basedir, 'instance', 'upload_spool'))
+    UPLOAD_BACKEND = os.getenv('UPLOAD_BACKEND', 'cloudinary' if os.getenv('CLOUDINARY_CLOUD_NAME') else 'local')
+    LOCAL_UPLOAD_DIR = os.getenv('LOCAL_UPLOAD_DIR', os.path.join(basedir, 'app', 'static', 'uploads'))
+    # Resized AVIF/WebP variants and initials avatars, served from /static/img_cache
+    IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', os.path.join(basedir, 'app', 'static', 'img_cache'))
+
+    # RSS feed: number of items and seconds the rendered feed is cached
+    RSS_FEED_ITEMS = int(os.getenv('RSS_FEED_ITEMS', 20))
+    RSS_CACHE_TIMEOUT = int(os.getenv('RSS_CACHE_TIMEOUT', 300))
+
+    # Buffered analytics writer: flush after this many events or seconds, drop beyond the max
+    ANALYTICS_FLUSH_SIZE = int(os.getenv('ANALYTICS_FLUSH_SIZE', 200))
+    ANALYTICS_FLUSH_INTERVAL = float(os.getenv('ANALYTICS_FLUSH_INTERVAL', 5.0))
+    ANALYTICS_BUFFER_MAX = int(os.getenv('ANALYTICS_BUFFER_MAX', 10000))
+    # Raw Analytics events older than this (and already rolled up) are removed by `aggregate-analytics --compact`
+    ANALYTICS_RAW_RETENTION_DAYS = int(os.getenv('ANALYTICS_RAW_RETENTION_DAYS', 90))
+
+    # Credibility scraper search-result cache (shared by all workers)
+    SEARCH_CACHE_PATH = os.getenv('SEARCH_CACHE_PATH', os.path.join(basedir, 'instance', 'search_cache.db'))
+    SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', 6 * 3600))  # 6 hours
+    SEARCH_CACHE_MAX_ENTRIES = int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 5000))
 
     # Production optimizations
     if ENVIRONMENT == "production":
@@ -47,9 +99,7 @@ class Config:
             'pool_recycle': 3600,
             'max_overflow': 20
         }
-        
-        # Cache configuration for visitor stats
-        VISITOR_CACHE_TIMEOUT = 300  # 5 minutes cache for visitor stats
+
 
     # Production environment validation
     @classmethod
@@ -84,7 +84,10 @@ def login_google():
     return f"Logged in as {user_info['email']}"
 
 if __name__ == '__main__':
-    # Setup admin and start application
+    # Apply pending migrations, setup admin and start application
+    from app.migrations import upgrade
+    with app.app_context():
+        upgrade()
     setup_super_admin()
 
     print("\n🚀 Starting Youth Times Project...")
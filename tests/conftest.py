@@ -0,0 +1,15 @@
+import pytest
+
+from config import Config
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The app on a fresh SQLite database in tmp_path, schema built by db-upgrade"""
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///' + str(tmp_path / 'test.db'))
+    monkeypatch.setattr(Config, 'SEARCH_CACHE_PATH', str(tmp_path / 'search_cache.db'), raising=False)
+    from app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    result = app.test_cli_runner().invoke(args=['db-upgrade'])
+    assert result.exit_code == 0, result.output
+    return app
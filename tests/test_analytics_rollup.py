@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.analytics_rollup import aggregate_analytics, last_processed_id
+from app.models import Analytics
+
+def test_late_insert_with_old_timestamp_waits_for_the_safety_lag(app):
+    with app.app_context():
+        settled = Analytics(event_type='view', timestamp=datetime.utcnow() - timedelta(hours=1),
+                            inserted_at=datetime.utcnow() - timedelta(minutes=5))
+        db.session.add(settled)
+        db.session.commit()
+        # A re-queued buffer batch: recorded an hour ago, inserted just now
+        late = Analytics(event_type='view', timestamp=datetime.utcnow() - timedelta(hours=1))
+        db.session.add(late)
+        db.session.commit()
+        assert late.inserted_at is not None  # Set by the database, not the event
+
+        assert aggregate_analytics(safety_lag=60) == 1
+        assert last_processed_id() == settled.id
+
+        # A minute later
+        late.inserted_at = datetime.utcnow() - timedelta(minutes=1)
+        db.session.commit()
+        assert aggregate_analytics(safety_lag=30) == 1
+        assert last_processed_id() == late.id
@@ -0,0 +1,49 @@
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.identity import IdentityCache
+from app.models import User
+
+def _user(role='user'):
+    user = User(username=f'{role}-user', password=generate_password_hash('pw'), role=role)
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+def test_admin_demotion_applies_in_every_process(app):
+    # Two caches stand in for two gunicorn workers sharing one database
+    worker_a, worker_b = IdentityCache(version_poll=60), IdentityCache(version_poll=60)
+    with app.app_context():
+        user_id = _user('admin')
+        assert worker_a.load(user_id).is_admin
+        assert worker_b.load(user_id).is_admin
+
+        user = db.session.get(User, user_id)
+        user.role = 'user'
+        db.session.commit()
+        worker_a.invalidate(user_id)
+
+        # worker_b has not polled the shared version yet, but admins are never cached
+        assert not worker_b.load(user_id).is_admin
+
+def test_deleted_user_is_dropped_by_other_processes(app):
+    worker_a, worker_b = IdentityCache(version_poll=0), IdentityCache(version_poll=0)
+    with app.app_context():
+        user_id = _user()
+        assert worker_b.load(user_id) is not None
+
+        db.session.delete(db.session.get(User, user_id))
+        db.session.commit()
+        worker_a.invalidate(user_id)
+
+        assert worker_b.load(user_id) is None
+
+def test_regular_users_are_served_from_the_cache(app):
+    cache = IdentityCache(version_poll=60)
+    with app.app_context():
+        user_id = _user()
+        cache.load(user_id)
+        db.session.delete(db.session.get(User, user_id))
+        db.session.commit()
+        # No invalidate(): the cached snapshot is still returned until the TTL or a version bump
+        assert cache.load(user_id).id == user_id
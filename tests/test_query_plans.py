@@ -0,0 +1,4 @@
+def test_hot_queries_use_indexes_on_sqlite(app):
+    result = app.test_cli_runner().invoke(args=['check-query-plans'])
+    assert result.exit_code == 0, result.output
+    assert 'FULL SCAN' not in result.output